@@ -0,0 +1,193 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+# ==========================
+# Settings
+# ==========================
+ARCHIVE_DIR = "archive"
+BLOBS_DIR = os.path.join(ARCHIVE_DIR, "blobs")
+ARCHIVE_MANIFEST = os.path.join(ARCHIVE_DIR, "manifest.json")
+COMPRESS_LEVEL = 6
+CHUNK_SIZE = 1024 * 1024
+
+# Date-prefixed full copies written by the previous archiver, e.g. 2025-06-02_new_articles_digest.csv
+LEGACY_NAME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})_(.+)$")
+
+# ==========================
+# Manifest
+# ==========================
+# {"snapshots": {date: {file name: {"sha256", "size", "mtime_ns"}}}}
+def load_archive_manifest(archive_dir=ARCHIVE_DIR):
+    path = os.path.join(archive_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {"snapshots": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_archive_manifest(manifest, archive_dir=ARCHIVE_DIR):
+    path = os.path.join(archive_dir, "manifest.json")
+    os.makedirs(archive_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+def latest_entry(manifest, name):
+    for date in sorted(manifest["snapshots"], reverse=True):
+        entry = manifest["snapshots"][date].get(name)
+        if entry:
+            return entry
+    return None
+
+# ==========================
+# Blobs
+# ==========================
+def blob_path(digest, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, "blobs", digest[:2], f"{digest}.gz")
+
+def hash_file(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def write_blob(file_path, digest, archive_dir=ARCHIVE_DIR):
+    # Returns False when the content is already stored
+    path = blob_path(digest, archive_dir)
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(file_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=COMPRESS_LEVEL) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    os.replace(tmp_path, path)
+    return True
+
+# ==========================
+# Snapshots
+# ==========================
+def snapshot_file(file_path, date=None, archive_dir=ARCHIVE_DIR, manifest=None):
+    """Record file_path under date; identical content is stored only once."""
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    own_manifest = manifest is None
+    manifest = load_archive_manifest(archive_dir) if own_manifest else manifest
+    name = os.path.basename(file_path)
+    stat = os.stat(file_path)
+
+    # Same size and mtime as the last snapshot: skip re-reading the file
+    previous = latest_entry(manifest, name)
+    if previous and previous["size"] == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        digest = previous["sha256"]
+    else:
+        digest = hash_file(file_path)
+    created = write_blob(file_path, digest, archive_dir)
+
+    manifest["snapshots"].setdefault(date, {})[name] = {
+        "sha256": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+    if own_manifest:
+        save_archive_manifest(manifest, archive_dir)
+    return digest, created
+
+def snapshot_entry(date, name, archive_dir=ARCHIVE_DIR):
+    entry = load_archive_manifest(archive_dir)["snapshots"].get(date, {}).get(name)
+    if entry is None:
+        raise KeyError(f"No snapshot of {name} on {date}")
+    return entry
+
+def open_snapshot(date, name, archive_dir=ARCHIVE_DIR, mode="rt"):
+    # Decompresses on the fly, e.g. csv.DictReader(open_snapshot(date, name))
+    digest = snapshot_entry(date, name, archive_dir)["sha256"]
+    if "b" in mode:
+        return gzip.open(blob_path(digest, archive_dir), mode)
+    return gzip.open(blob_path(digest, archive_dir), mode, encoding="utf-8", newline="")
+
+def restore_snapshot(date, name, dest=None, archive_dir=ARCHIVE_DIR):
+    dest = dest or name
+    with open_snapshot(date, name, archive_dir, mode="rb") as src, open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    return dest
+
+def list_snapshots(archive_dir=ARCHIVE_DIR):
+    return load_archive_manifest(archive_dir)["snapshots"]
+
+# ==========================
+# Maintenance
+# ==========================
+def import_legacy(archive_dir=ARCHIVE_DIR):
+    # Moves date-prefixed full copies into the blob store
+    manifest = load_archive_manifest(archive_dir)
+    imported = 0
+    for entry in sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else []:
+        match = LEGACY_NAME_RE.match(entry)
+        path = os.path.join(archive_dir, entry)
+        if not match or not os.path.isfile(path):
+            continue
+        date, name = match.groups()
+        digest = hash_file(path)
+        write_blob(path, digest, archive_dir)
+        stat = os.stat(path)
+        manifest["snapshots"].setdefault(date, {})[name] = {"sha256": digest, "size": stat.st_size}
+        os.remove(path)
+        imported += 1
+    save_archive_manifest(manifest, archive_dir)
+    return imported
+
+def collect_garbage(archive_dir=ARCHIVE_DIR):
+    # Drops blobs no snapshot points to (e.g. after a same-day re-run replaced an entry)
+    referenced = {
+        entry["sha256"]
+        for files in load_archive_manifest(archive_dir)["snapshots"].values()
+        for entry in files.values()
+    }
+    removed = 0
+    blobs_dir = os.path.join(archive_dir, "blobs")
+    for root, _, files in os.walk(blobs_dir):
+        for blob in files:
+            if blob.endswith(".gz") and blob[:-3] not in referenced:
+                os.remove(os.path.join(root, blob))
+                removed += 1
+    return removed
+
+def archive_usage(archive_dir=ARCHIVE_DIR):
+    snapshots = list_snapshots(archive_dir)
+    logical = sum(entry["size"] for files in snapshots.values() for entry in files.values())
+    stored = 0
+    for root, _, files in os.walk(os.path.join(archive_dir, "blobs")):
+        stored += sum(os.path.getsize(os.path.join(root, blob)) for blob in files)
+    return logical, stored
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and restore archived CSV snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list snapshot dates and files")
+    restore = commands.add_parser("restore", help="write a snapshot back to disk")
+    restore.add_argument("date")
+    restore.add_argument("name")
+    restore.add_argument("dest", nargs="?", help="output path (default: the file name)")
+    commands.add_parser("import-legacy", help="move date-prefixed copies in archive/ into the blob store")
+    commands.add_parser("gc", help="delete blobs no snapshot refers to")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for date, files in sorted(list_snapshots().items()):
+            for name, entry in sorted(files.items()):
+                print(f"{date}  {name:<32} {entry['size'] / 1024:>10.1f} KiB  {entry['sha256'][:12]}")
+        logical, stored = archive_usage()
+        print(f"📦 {logical / 1024:.1f} KiB archived, {stored / 1024:.1f} KiB on disk")
+    elif args.command == "restore":
+        print(f"Restored {args.name} ({args.date}) → {restore_snapshot(args.date, args.name, args.dest)}")
+    elif args.command == "import-legacy":
+        print(f"Imported {import_legacy()} legacy archive files")
+    elif args.command == "gc":
+        print(f"🗑️ Removed {collect_garbage()} unreferenced blobs")
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from corpus_store import iso_date
+
+# ==========================
+# Settings
+# ==========================
+RIVERS = ["Po", "Sarca", "Chiese", "Adige", "Noce", "Brenta", "Avisio"]
+OTHERS = "Others"
+
+S2_PAGE_SIZE = 100  # the API's default limit; the scraper does not send one
+OTHER_QUERY_SHARDS = 3  # each non-river query sees about a third of the unlabeled papers
+
+TOPIC_WORDS = [
+    "drought", "water", "river", "basin", "irrigation", "scarcity", "flow", "hydrology",
+    "climate", "precipitation", "flooding", "groundwater", "evaporation", "runoff",
+    "conservation", "ecosystem", "sustainability", "water management", "water quality",
+    "water stress", "resource management", "SPI", "SPEI", "PDSI", "soil moisture",
+    "snowpack", "reservoir", "Copernicus", "satellite", "agricultural drought", "Alpine",
+    "heatwave", "streamflow", "aquifer", "discharge", "monitoring", "policy", "Italy"
+]
+FILLER_WORDS = [
+    "the", "of", "and", "in", "a", "to", "for", "on", "with", "we", "this", "study",
+    "results", "analysis", "show", "using", "data", "model", "during", "period", "between",
+    "observed", "trends", "regional", "seasonal", "years", "impact", "approach", "indices"
+]
+
+# ==========================
+# Synthetic corpus
+# ==========================
+def parse_river_mix(spec):
+    # "Po=3,Adige=1,Others=2" -> normalized weights; an empty spec mixes all rivers + Others evenly
+    if not spec:
+        return {river: 1.0 for river in RIVERS + [OTHERS]}
+    weights = {}
+    for part in spec.split(","):
+        river, _, weight = part.partition("=")
+        weights[river.strip()] = float(weight or 1)
+    return weights
+
+def synthetic_abstract(rng, words, jitter):
+    length = max(20, int(rng.gauss(words, jitter))) if jitter else words
+    tokens = [rng.choice(TOPIC_WORDS) if rng.random() < 0.3 else rng.choice(FILLER_WORDS) for _ in range(length)]
+    sentences = [" ".join(tokens[i:i + 18]) for i in range(0, len(tokens), 18)]
+    return " ".join(s[0].upper() + s[1:] + "." for s in sentences)
+
+def synthetic_papers(n, seed=0, abstract_words=180, abstract_jitter=60, river_mix=None, start_date="2015-01-01", days=3650):
+    """Return n Semantic Scholar-shaped papers plus their river label, sorted by publication date."""
+    rng = random.Random(seed)
+    mix = river_mix or parse_river_mix("")
+    rivers, weights = list(mix), list(mix.values())
+    start = time.mktime(time.strptime(start_date, "%Y-%m-%d"))
+    papers = []
+    for i in range(n):
+        river = rng.choices(rivers, weights)[0]
+        pub_date = time.strftime("%Y-%m-%d", time.localtime(start + rng.randrange(days) * 86400))
+        paper_id = hashlib.sha1(f"{seed}-{i}".encode()).hexdigest()
+        place = f"the {river} River basin" if river != OTHERS else "northern Italy"
+        papers.append({
+            "paperId": paper_id,
+            "title": f"{rng.choice(TOPIC_WORDS).capitalize()} and {rng.choice(TOPIC_WORDS)} in {place}: study {i}",
+            "year": int(pub_date[:4]),
+            "publicationDate": pub_date,
+            "url": f"https://www.semanticscholar.org/paper/{paper_id}",
+            "abstract": synthetic_abstract(rng, abstract_words, abstract_jitter),
+            "authors": [{"name": f"Author {rng.randrange(500)}"} for _ in range(rng.randint(1, 5))],
+            "river": river
+        })
+    papers.sort(key=lambda p: p["publicationDate"])
+    return papers
+
+def corpus_row(paper):
+    # Same columns build_entries produces, keywords left for the YAKE stage
+    return {
+        "title": paper["title"],
+        "authors": ", ".join(a["name"] for a in paper["authors"]),
+        "year": paper["year"],
+        "publicationDate": paper["publicationDate"],
+        "link": paper["url"],
+        "abstract": paper["abstract"],
+        "river": "" if paper["river"] == OTHERS else paper["river"],
+        "keywords": "",
+        "source": "Semantic Scholar",
+        "scraped_at": paper["publicationDate"] + "T00:00:00"
+    }
+
+# ==========================
+# Semantic Scholar stub
+# ==========================
+class ScholarStub(ThreadingHTTPServer):
+    """Serves /graph/v1/paper/search from an in-memory paper pool.
+
+    River queries return that river's papers, the other queries a hashed shard of the
+    unlabeled ones. latency and rate_429 are injected per request.
+    """
+    daemon_threads = True
+
+    def __init__(self, papers=(), latency=0.0, rate_429=0.0, retry_after=1, seed=0, port=0):
+        super().__init__(("127.0.0.1", port), ScholarStubHandler)
+        self.papers = list(papers)
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+
+    def matching(self, query, since):
+        river = next((r for r in RIVERS if query.startswith(f"{r} River")), None)
+        shard = zlib.crc32(query.encode()) % OTHER_QUERY_SHARDS
+        found = []
+        for p in self.papers:
+            if since and p["publicationDate"] < since:
+                continue
+            if river is not None:
+                if p["river"] == river:
+                    found.append(p)
+            elif p["river"] == OTHERS and int(p["paperId"][:8], 16) % OTHER_QUERY_SHARDS == shard:
+                found.append(p)
+        # Relevance order is unrelated to date, so mix known and new papers like the real API
+        return sorted(found, key=lambda p: p["paperId"])
+
+    def reset_counters(self):
+        with self.lock:
+            counters = {"requests": self.requests, "throttled": self.throttled}
+            self.requests = self.throttled = 0
+        return counters
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server_port}/graph/v1/paper/search"
+
+class ScholarStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path != "/graph/v1/paper/search":
+            self.send_error(404)
+            return
+        with server.lock:
+            server.requests += 1
+            throttle = server.rng.random() < server.rate_429
+            if throttle:
+                server.throttled += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if throttle:
+            self.send_response(429)
+            self.send_header("Retry-After", str(server.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", S2_PAGE_SIZE))
+        since = iso_date(params.get("publicationDateOrYear", "").split(":")[0])
+        fields = params.get("fields", "").split(",")
+        found = server.matching(params.get("query", ""), since)
+        page = [{k: p[k] for k in ["paperId"] + fields if k in p} for p in found[offset:offset + limit]]
+        body = {"total": len(found), "offset": offset, "data": page}
+        if offset + limit < len(found):
+            body["next"] = offset + limit
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+# ==========================
+# Ollama stub
+# ==========================
+FAKE_SUMMARY = (
+    "Recent studies report worsening drought conditions across the basin. "
+    "Standardized indices such as SPI and SPEI were used to track precipitation deficits. "
+    "The findings support earlier warnings for irrigation and water management. "
+    "Further monitoring of groundwater and streamflow is recommended. "
+    "Several papers also discuss policy responses."
+)
+
+class OllamaStub(ThreadingHTTPServer):
+    """Answers /api/generate (streaming or not) at tokens_per_sec after ttft seconds."""
+    daemon_threads = True
+
+    def __init__(self, tokens_per_sec=40.0, ttft=0.2, port=0):
+        super().__init__(("127.0.0.1", port), OllamaStubHandler)
+        self.tokens_per_sec = tokens_per_sec
+        self.ttft = ttft
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.tokens = 0
+        self.prompt_chars = 0
+
+    def reset_counters(self):
+        with self.lock:
+            counters = {"calls": self.calls, "tokens": self.tokens, "prompt_chars": self.prompt_chars}
+            self.calls = self.tokens = self.prompt_chars = 0
+        return counters
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server_port}"
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        if urlparse(self.path).path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = body.get("prompt", "")
+        limit = (body.get("options") or {}).get("num_predict") or 350
+        tokens = [word + " " for word in FAKE_SUMMARY.split(" ")][:limit]
+        with server.lock:
+            server.calls += 1
+            server.prompt_chars += len(prompt)
+        delay = 1 / server.tokens_per_sec
+        time.sleep(server.ttft)
+
+        if not body.get("stream", True):
+            time.sleep(delay * len(tokens))
+            self.count_tokens(len(tokens))
+            self.send_json(self.final(body, "".join(tokens), len(tokens)))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        try:
+            for token in tokens:
+                time.sleep(delay)
+                self.write_chunk({"model": body.get("model"), "response": token, "done": False})
+                sent += 1
+            self.write_chunk(self.final(body, "", sent))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped early; Ollama stops decoding at this point too
+            self.close_connection = True
+        self.count_tokens(sent)
+
+    def final(self, body, response, tokens):
+        return {
+            "model": body.get("model"),
+            "response": response,
+            "done": True,
+            "prompt_eval_count": len(body.get("prompt", "")) // 4,
+            "eval_count": tokens,
+            "eval_duration": int(tokens / self.server.tokens_per_sec * 1e9)
+        }
+
+    def count_tokens(self, n):
+        with self.server.lock:
+            self.server.tokens += n
+
+    def write_chunk(self, message):
+        line = (json.dumps(message) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def send_json(self, message):
+        payload = json.dumps(message).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
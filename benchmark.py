@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bench_stubs import RIVERS, OllamaStub, ScholarStub, corpus_row, parse_river_mix, synthetic_papers
+from corpus_store import CORPUS_FIELDS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ==========================
+# Settings
+# ==========================
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_FILE = "benchmark_report.json"
+RESULT_FILE = "result.json"  # written by the worker inside its scratch directory
+LOG_FILE = "bench.log"
+
+DEFAULT_SIZES = [100, 1000, 5000]
+
+# ==========================
+# Worker: runs the pipeline pieces inside a scratch directory
+# ==========================
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+def run_worker():
+    # Imported here so the stub URLs in the environment are picked up at import time
+    start = time.perf_counter()
+    import dashboard_data
+    import keywords
+    import llama_digest
+    import semantic_scraper
+    from corpus_store import iter_articles
+    stages = {"import": {"seconds": time.perf_counter() - start}}
+
+    _, elapsed = timed(semantic_scraper.main)
+    stages["scrape"] = {"seconds": elapsed, "new_articles": count_rows(semantic_scraper.DIGEST_FILE)}
+
+    articles = list(iter_articles(semantic_scraper.CSV_FILE))
+    _, cold = timed(keywords.extract_keywords, articles)
+    _, warm = timed(keywords.extract_keywords, articles)
+    stages["yake"] = {
+        "seconds": cold,
+        "warm_seconds": warm,
+        "abstracts": len(articles),
+        "abstracts_per_sec": len(articles) / cold if cold > 0 else None
+    }
+
+    rows, elapsed = timed(llama_digest.main, full=True)
+    calls = llama_digest.llm_calls
+    stages["llama_digest"] = {
+        "seconds": elapsed,
+        "rivers": len(rows),
+        "llm_calls": len(calls),
+        "mean_ttft": sum(c["ttft"] for c in calls) / len(calls) if calls else None,
+        "mean_tokens_per_sec": sum(c["tokens_per_sec"] for c in calls) / len(calls) if calls else None,
+        "prompt_chars": sum(c["prompt_chars"] for c in calls)
+    }
+
+    data, elapsed = timed(dashboard_data.load_dashboard_data, known_rivers=RIVERS)
+    stages["dashboard_load"] = {"seconds": elapsed, "articles": len(data["articles"])}
+
+    result = {"stages": stages}
+    if resource is not None:
+        result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(RESULT_FILE, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+# ==========================
+# Harness
+# ==========================
+def write_corpus(path, papers):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CORPUS_FIELDS)
+        writer.writeheader()
+        writer.writerows(corpus_row(p) for p in papers)
+
+def split_corpus(papers, size):
+    # The corpus is the oldest `size` papers; the API serves everything from its last date on,
+    # so papers on the boundary date are both known and returned (exercising dedup)
+    corpus = papers[:size]
+    since = corpus[-1]["publicationDate"] if corpus else ""
+    return corpus, [p for p in papers if p["publicationDate"] >= since]
+
+def run_size(size, args, scholar, ollama_stub, env):
+    new_papers = max(1, int(size * args.new_fraction))
+    papers = synthetic_papers(
+        size + new_papers,
+        seed=args.seed,
+        abstract_words=args.abstract_words,
+        abstract_jitter=args.abstract_jitter,
+        river_mix=parse_river_mix(args.river_mix)
+    )
+    corpus, pool = split_corpus(papers, size)
+
+    workdir = tempfile.mkdtemp(prefix=f"bench-{size}-")
+    try:
+        write_corpus(os.path.join(workdir, "semantic_scholar_results.csv"), corpus)
+        scholar.papers = pool
+        scholar.reset_counters()
+        ollama_stub.reset_counters()
+
+        print(f"▶️ Corpus of {size} papers, {len(pool)} served by the API stub ...")
+        start = time.perf_counter()
+        with open(os.path.join(workdir, LOG_FILE), "w", encoding="utf-8") as log:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker"], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            with open(os.path.join(workdir, LOG_FILE), encoding="utf-8") as log:
+                tail = log.read()[-2000:]
+            raise RuntimeError(f"Benchmark worker failed for size {size}:\n{tail}")
+
+        with open(os.path.join(workdir, RESULT_FILE), encoding="utf-8") as f:
+            result = json.load(f)
+        result["stages"]["scrape"].update(scholar.reset_counters())
+        result["stages"]["llama_digest"].update({f"server_{k}": v for k, v in ollama_stub.reset_counters().items()})
+        result.update(size=size, api_papers=len(pool), wall_seconds=elapsed)
+        for name, stage in result["stages"].items():
+            print(f"  {name:<15} {stage['seconds']:.2f}s")
+        return result
+    finally:
+        if args.keep:
+            print(f"  kept scratch directory {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def git_commit():
+    with contextlib.suppress(OSError, subprocess.CalledProcessError):
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    return None
+
+def run_benchmark(args):
+    scholar = ScholarStub(latency=args.latency_ms / 1000, rate_429=args.rate_429, retry_after=args.retry_after, seed=args.seed)
+    ollama_stub = OllamaStub(tokens_per_sec=args.tokens_per_sec, ttft=args.ttft_ms / 1000)
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])),
+        S2_API_URL=scholar.start(),
+        S2_REQUESTS_PER_SECOND=str(args.requests_per_second),
+        OLLAMA_HOST=ollama_stub.start()
+    )
+    env.pop("S2_API_KEY", None)
+    try:
+        runs = [run_size(size, args, scholar, ollama_stub, env) for size in args.sizes]
+    finally:
+        scholar.shutdown()
+        ollama_stub.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("worker", "output", "compare", "keep")},
+        "runs": runs
+    }
+
+def compare_reports(previous, current):
+    print(f"\n📊 {previous.get('commit')} → {current.get('commit')}")
+    before = {run["size"]: run["stages"] for run in previous["runs"]}
+    for run in current["runs"]:
+        old_stages = before.get(run["size"])
+        if old_stages is None:
+            continue
+        print(f"  size {run['size']}:")
+        for name, stage in run["stages"].items():
+            old = old_stages.get(name, {}).get("seconds")
+            if not old:
+                continue
+            change = (stage["seconds"] - old) / old
+            print(f"    {name:<15} {old:8.2f}s → {stage['seconds']:8.2f}s  ({change:+.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against local Semantic Scholar and Ollama stand-ins.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="corpus sizes to run")
+    parser.add_argument("--new-fraction", type=float, default=0.1, help="new papers served by the API, as a fraction of the corpus")
+    parser.add_argument("--abstract-words", type=int, default=180, help="mean abstract length in words")
+    parser.add_argument("--abstract-jitter", type=int, default=60, help="standard deviation of the abstract length")
+    parser.add_argument("--river-mix", default="", help="river weights, e.g. Po=3,Adige=1,Others=2 (default: even)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="API stub latency per request")
+    parser.add_argument("--rate-429", type=float, default=0.05, help="fraction of API requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--requests-per-second", type=float, default=20, help="scraper rate limit during the benchmark")
+    parser.add_argument("--tokens-per-sec", type=float, default=40, help="fake Ollama decode speed")
+    parser.add_argument("--ttft-ms", type=float, default=200, help="fake Ollama time to first token")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=REPORT_FILE, help="JSON report path")
+    parser.add_argument("--compare", metavar="REPORT", help="print stage timings against an earlier report")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directories")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+        sys.exit(0)
+
+    report = run_benchmark(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"\n✅ Saved benchmark report to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
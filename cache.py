@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ==========================
+# Settings
+# ==========================
+CACHE_DIR = ".cache"
+
+def make_key(*parts):
+    # Content-addressed key: the same inputs always hash to the same entry
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ==========================
+# SQLite-backed cache
+# ==========================
+class SQLiteCache:
+    """Persistent key/value cache with an optional TTL and a size-bounded LRU.
+
+    Values are stored as text (callers serialize to JSON). Every entry carries a
+    free-form tag so that a group of entries (e.g. one model) can be dropped at once.
+    """
+
+    def __init__(self, path, ttl=None, max_bytes=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    tag TEXT NOT NULL DEFAULT '',
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag)")
+            # Running byte total, so a write never has to sum the whole table, and lookup counts
+            # over every process that used the file (self.hits/self.misses are this process only)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('hits', 0), ('misses', 0)")
+            if self.ttl is not None:
+                self._expire()
+
+    def _add_bytes(self, delta):
+        if delta:
+            self.conn.execute("UPDATE meta SET value = value + ? WHERE key = 'bytes'", (delta,))
+
+    def _count(self, outcome):
+        self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (outcome,))
+        if outcome == "hits":
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _total_bytes(self):
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value, size, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            value, size, created_at = row
+            # Expired entries are dropped when read; the rest go when the cache is opened or full
+            if self.ttl is not None and now - created_at > self.ttl:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._add_bytes(-size)
+                self._count("misses")
+                return None
+            self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            return value
+
+    def set(self, key, value, tag=""):
+        self.set_many([(key, value)], tag=tag)
+
+    def set_many(self, items, tag=""):
+        """Store (key, value) pairs in one transaction."""
+        now = time.time()
+        with self.lock, self.conn:
+            for key, value in items:
+                size = len(value.encode("utf-8"))
+                old = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, tag, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, value, tag, size, now, now)
+                )
+                self._add_bytes(size - (old[0] if old else 0))
+            self._evict()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE created_at < ?", (cutoff,)).fetchone()[0]
+        self.conn.execute("DELETE FROM entries WHERE created_at < ?", (cutoff,))
+        self._add_bytes(-expired)
+
+    def _evict(self):
+        if self.max_bytes is None or self._total_bytes() <= self.max_bytes:
+            return
+        if self.ttl is not None:
+            self._expire()
+        total = self._total_bytes()
+        # Drop least recently used entries down to 90% of the bound, so the next writes do not evict again
+        target = self.max_bytes * 0.9
+        stale = []
+        freed = 0
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+            if total - freed <= target:
+                break
+            stale.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        self._add_bytes(-freed)
+
+    def invalidate(self, tag=None):
+        with self.lock, self.conn:
+            if tag is None:
+                cur = self.conn.execute("DELETE FROM entries")
+                self.conn.execute("UPDATE meta SET value = 0 WHERE key = 'bytes'")
+            else:
+                removed = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE tag = ?", (tag,)).fetchone()[0]
+                cur = self.conn.execute("DELETE FROM entries WHERE tag = ?", (tag,))
+                self._add_bytes(-removed)
+            return cur.rowcount
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            totals = dict(self.conn.execute("SELECT key, value FROM meta WHERE key IN ('hits', 'misses')"))
+        lookups = self.hits + self.misses
+        total_lookups = totals["hits"] + totals["misses"]
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "total_hits": totals["hits"],
+            "total_misses": totals["misses"],
+            "total_hit_rate": totals["hits"] / total_lookups if total_lookups else 0.0
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
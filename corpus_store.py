@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+import re
+import uuid
+from itertools import islice
+
+# ==========================
+# Settings
+# ==========================
+CORPUS_FIELDS = ["title","authors","year","publicationDate","link","abstract","river","keywords","source","scraped_at"]
+
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+def iso_date(value):
+    # Only well-formed YYYY-MM-DD prefixes take part in watermark comparisons
+    match = ISO_DATE_RE.match(str(value or ""))
+    return match.group(0) if match else ""
+
+# ==========================
+# Manifest
+# ==========================
+def manifest_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".manifest.json"
+
+def save_manifest(csv_path, manifest):
+    path = manifest_path(csv_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+def rebuild_manifest(csv_path, previous=None):
+    # One streaming pass over the corpus; only needed when the manifest is missing or stale
+    row_count = 0
+    max_date = ""
+    for a in iter_articles(csv_path):
+        row_count += 1
+        pub_date = iso_date(a.get("publicationDate"))
+        if pub_date > max_date:
+            max_date = pub_date
+    manifest = {
+        "row_count": row_count,
+        "max_publication_date": max_date,
+        # Per-query cursors cannot be recovered from the CSV, so keep the old ones
+        "query_watermarks": (previous or {}).get("query_watermarks", {}),
+        **({"run_cursors": previous["run_cursors"]} if previous and "run_cursors" in previous else {}),
+        "size": os.path.getsize(csv_path),
+        # A new generation tells derived indexes that existing rows may have changed
+        "generation": uuid.uuid4().hex
+    }
+    save_manifest(csv_path, manifest)
+    print(f"Rebuilt manifest for {csv_path} ({row_count} rows).")
+    return manifest
+
+def load_manifest(csv_path):
+    ensure_corpus(csv_path)
+    path = manifest_path(csv_path)
+    manifest = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                manifest = json.load(f)
+            except json.JSONDecodeError:
+                manifest = None
+        # A size mismatch means the CSV was rewritten outside the store
+        if manifest and manifest.get("size") == os.path.getsize(csv_path):
+            manifest.setdefault("query_watermarks", {})
+            if "generation" not in manifest:
+                manifest["generation"] = uuid.uuid4().hex
+                save_manifest(csv_path, manifest)
+            return manifest
+    return rebuild_manifest(csv_path, manifest)
+
+def query_watermark(manifest, query):
+    # Falls back to the global watermark for queries that have never run
+    return manifest["query_watermarks"].get(query) or manifest.get("max_publication_date", "")
+
+def pin_run_cursors(csv_path, manifest, run_id, cursors):
+    # A retry of the same run reuses the cursors it started with, even after the watermarks
+    # advanced, so it sends the same requests and is answered from the response cache
+    pinned = manifest.get("run_cursors")
+    if pinned and pinned.get("run_id") == run_id:
+        return {query: pinned["cursors"].get(query, cursor) for query, cursor in cursors.items()}
+    manifest["run_cursors"] = {"run_id": run_id, "cursors": cursors}
+    save_manifest(csv_path, manifest)
+    return cursors
+
+def clear_run_cursors(csv_path, manifest=None):
+    # Called once a run has completed; the next run starts from the watermarks
+    manifest = manifest or load_manifest(csv_path)
+    if manifest.pop("run_cursors", None) is not None:
+        save_manifest(csv_path, manifest)
+
+def update_query_watermarks(csv_path, manifest, watermarks):
+    changed = False
+    for query, pub_date in watermarks.items():
+        pub_date = iso_date(pub_date)
+        if pub_date and pub_date > manifest["query_watermarks"].get(query, ""):
+            manifest["query_watermarks"][query] = pub_date
+            changed = True
+    if changed:
+        save_manifest(csv_path, manifest)
+    return manifest
+
+# ==========================
+# Append-only corpus CSV
+# ==========================
+def ensure_corpus(csv_path):
+    if not os.path.exists(csv_path):
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CORPUS_FIELDS)
+            writer.writeheader()
+
+def read_header(csv_path):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), None) or CORPUS_FIELDS
+
+def iter_articles(csv_path):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+def append_articles(csv_path, articles, manifest):
+    # Cost is O(new rows): existing rows are never read or rewritten
+    if not articles:
+        return manifest
+    fieldnames = read_header(csv_path)
+    size_before = os.path.getsize(csv_path)
+    needs_newline = False
+    if size_before > 0:
+        with open(csv_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) not in (b"\n", b"\r")
+    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+        if needs_newline:
+            f.write("\r\n")
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writerows(articles)
+
+    manifest["row_count"] = manifest.get("row_count", 0) + len(articles)
+    new_max = max(iso_date(a.get("publicationDate")) for a in articles)
+    if new_max > manifest.get("max_publication_date", ""):
+        manifest["max_publication_date"] = new_max
+    manifest["size"] = os.path.getsize(csv_path)
+    manifest["appended_from_size"] = size_before
+    save_manifest(csv_path, manifest)
+    return manifest
+
+# ==========================
+# Derived indexes
+# ==========================
+# Indexes built from the corpus (full-text search, near-duplicates) keep this state
+# in a `meta` table of their own SQLite file
+INDEX_META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+
+def read_index_state(conn):
+    conn.execute(INDEX_META_SCHEMA)
+    return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+def sync_derived_index(conn, csv_path, insert, clear, appended=None, config=""):
+    """Bring an index derived from the append-only corpus up to date.
+
+    insert(rows) adds corpus rows and returns how many it indexed; clear() empties
+    the index. `appended` are the rows just written by append_articles; they are
+    inserted directly only when the index matched the file right before that append.
+    Returns (mode, rows added, corpus row count); mode is "current", "appended",
+    "incremental" or "rebuild".
+    """
+    manifest = load_manifest(csv_path)
+    row_count, size = manifest["row_count"], manifest["size"]
+    with conn:
+        state = read_index_state(conn)
+        indexed_rows = int(state.get("indexed_rows", -1))
+        indexed_size = int(state.get("indexed_size", -1))
+        same_rows = state.get("generation") == manifest["generation"] and state.get("config", "") == config
+
+        if same_rows and indexed_rows == row_count and indexed_size == size:
+            return "current", 0, row_count
+        if (same_rows and appended and indexed_rows == row_count - len(appended)
+                and indexed_size == manifest.get("appended_from_size")):
+            mode, rows = "appended", appended
+        elif same_rows and 0 <= indexed_rows < row_count and indexed_size < size:
+            # Rows are only ever appended within a generation, so the first indexed_rows are already in
+            mode, rows = "incremental", islice(iter_articles(csv_path), indexed_rows, None)
+        else:
+            # The corpus was rewritten (e.g. keyword backfill) or the index settings changed
+            clear()
+            mode, rows = "rebuild", iter_articles(csv_path)
+        added = insert(rows)
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+            ("indexed_rows", str(row_count)),
+            ("indexed_size", str(size)),
+            ("generation", manifest["generation"]),
+            ("config", config)
+        ])
+    return mode, added, row_count
@@ -0,0 +1,217 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ==========================
+# Configuration
+# ==========================
+AI_DIGEST_FILE = "new_articles_digest_ai.csv" 
+ARTICLES_FILE = "new_articles_digest.csv"     
+
+DATE_FORMAT = "%d %b %Y" # Format: 10 Dec 2025
+
+# River colors mapping
+COLOR_MAP = {
+    "Po": "#1f77b4",       # blue
+    "Adige": "#ff7f0e",    # orange
+    "Chiese": "#2ca02c",   # green
+    "Noce": "#9467bd",     # purple
+    "Sarca": "#8c564b",    # brown
+    "Brenta": "#e377c2",   # pink
+    "Avisio": "#7f7f7f"    # gray
+}
+
+# Map center coordinates for focused view
+CENTER_MAP = {
+    "Po": [45.0, 9.5],      
+    "Adige": [45.5, 11.0],  
+    "Chiese": [45.7, 10.5], 
+    "Noce": [46.3, 11.0],   
+    "Sarca": [46.0, 10.9],  
+    "Brenta": [45.6, 11.7], 
+    "Avisio": [46.3, 11.5], 
+    "Others": [43.5, 12.5], 
+    "default": [43.5, 12.5] 
+}
+
+# Map zoom levels
+ZOOM_MAP = {
+    "Po": 7,
+    "Adige": 8,
+    "Chiese": 9,
+    "Noce": 10,
+    "Sarca": 10,
+    "Brenta": 9,
+    "Avisio": 10,
+    "Others": 6,
+    "default": 6
+}
+
+REQUIRED_COLS = ['title', 'abstract', 'link', 'river', 'year', 'authors', 'keywords', 'publicationDate']
+
+# ==========================
+# Data version
+# ==========================
+def file_version(path):
+    # Cheap cache key: changes whenever the file is rewritten
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+# ==========================
+# Loaders
+# ==========================
+def load_digest(path, warnings):
+    try:
+        df_digest = pd.read_csv(path)
+        df_digest.columns = df_digest.columns.str.strip() 
+    except pd.errors.EmptyDataError:
+        warnings.append(f"Warning: The file {path} is empty. River summaries will be unavailable.")
+        df_digest = pd.DataFrame(columns=["river", "summary", "keywords"])
+    return df_digest
+
+def load_articles(path, warnings):
+    try:
+        # Use parse_dates to convert publicationDate column to datetime objects
+        df_articles = pd.read_csv(path, parse_dates=['publicationDate'])
+        df_articles.columns = df_articles.columns.str.strip() 
+    except pd.errors.EmptyDataError:
+        warnings.append(f"Warning: The file {path} is empty. Article listings will be unavailable.")
+        df_articles = pd.DataFrame(columns=REQUIRED_COLS)
+
+    # Check for required columns in df_articles and initialize if missing
+    for col in REQUIRED_COLS:
+        if col not in df_articles.columns:
+            df_articles[col] = np.nan
+    if not pd.api.types.is_datetime64_any_dtype(df_articles['publicationDate']):
+        df_articles['publicationDate'] = pd.to_datetime(df_articles['publicationDate'], errors='coerce')
+    return df_articles
+
+def date_range(df_articles):
+    # Drop NaT (Not a Time) values resulting from parsing errors
+    dates = df_articles['publicationDate'].dropna()
+    if dates.empty:
+        return "N/A", "N/A"
+    return dates.min().strftime(DATE_FORMAT), dates.max().strftime(DATE_FORMAT)
+
+def summary_lookup(df_digest_summary):
+    lookup = {}
+    for row in df_digest_summary.itertuples(index=False):
+        lookup[row.river] = {
+            "summary": getattr(row, "summary", None),
+            "keywords": getattr(row, "keywords", None)
+        }
+    return lookup
+
+def build_river_index(df_articles, summaries, known_rivers):
+    """Map every tab (known rivers plus "Others") to its article row positions and digest record."""
+    river_col = df_articles['river'].where(df_articles['river'].isin(known_rivers), "Others")
+    positions = river_col.groupby(river_col, sort=False).indices
+    empty = np.array([], dtype=np.intp)
+
+    index = {}
+    for river in list(known_rivers) + ["Others"]:
+        record = summaries.get(river, {})
+        index[river] = {
+            "rows": positions.get(river, empty),
+            "summary": record.get("summary"),
+            "keywords": record.get("keywords"),
+            "has_digest": river in summaries
+        }
+    return index
+
+# ==========================
+# Article cards
+# ==========================
+KEYWORD_TRIM_RE = r'^[\s"\'\-]+|[\s"\'\-]+$'
+# Badge style: reduced size and nowrap for better fit
+BADGE_STYLE = "background-color: #e8e8e8; color: #333; padding: 2px 5px; border-radius: 4px; font-size: 0.75em; margin-right: 5px; margin-bottom: 5px; display: inline-block; white-space: nowrap;"
+ORIGINAL_TAG_STYLE = "background-color: #e0e0e0; color: #444; padding: 2px 6px; border-radius: 3px; font-weight: 500; font-size: 0.9em;"
+SCROLL_X = "white-space: nowrap; overflow-x: auto; overflow-y: hidden;"
+
+def split_keywords(kw_str):
+    # Parsing logic: Prioritize ; then , then treat as single string
+    if ';' in kw_str:
+        return [kw.strip() for kw in kw_str.split(';') if kw.strip()]
+    if ',' in kw_str:
+        return [kw.strip() for kw in kw_str.split(',') if kw.strip()]
+    return [kw_str] if kw_str else []
+
+def keyword_badges(kw_str):
+    badges = "".join(f"<span style='{BADGE_STYLE}'>{kw}</span>" for kw in split_keywords(kw_str))
+    return badges or "N/A"
+
+def card_html(title, authors_text, tag_display, display_date, badges):
+    # One markdown fragment per card: title, authors, tag/date, keyword badges, divider
+    return "\n".join([
+        f"<h4 style='{SCROLL_X} margin-top: 0; margin-bottom: 5px;'>{title}</h4>",
+        f"<div style='{SCROLL_X} margin-bottom: 5px;'><b>Authors:</b> <i>{authors_text}</i></div>",
+        f"<p style='margin-bottom: 5px; {SCROLL_X}'>{tag_display} ({display_date})</p>",
+        f"<div style='margin-top: 5px; margin-bottom: 0; {SCROLL_X}'><b>Keywords:</b> {badges}</div>",
+        "<hr style='margin: 1rem 0;'>"
+    ])
+
+def build_cards(df_articles, known_rivers):
+    """Render every article card once per data version; NaN titles get no card."""
+    river = df_articles['river']
+    tab = river.where(river.isin(known_rivers), "Others")
+
+    # River tag handling: untagged rows show the tab they are listed under
+    final_tag = river.where(river.notna() & (river != 'N/A'), tab)
+    original_tag = (tab == "Others") & (final_tag != "Others")
+
+    # Date formatting (uses publicationDate if available, year otherwise)
+    display_date = df_articles['publicationDate'].dt.strftime(DATE_FORMAT)
+    display_date = display_date.fillna(df_articles['year'].map(str))
+
+    authors = df_articles['authors']
+    authors_text = authors.where(authors.notna() & (authors != 'N/A'), 'N/A')
+
+    # Deep cleaning: remove unwanted start/end chars (quotes, extra whitespace)
+    cleaned = df_articles['keywords'].dropna().astype(str).str.strip().str.replace(KEYWORD_TRIM_RE, '', regex=True)
+    badges = cleaned.map(keyword_badges).reindex(df_articles.index, fill_value="N/A")
+
+    cards = []
+    for title, authors_str, tag, is_original, tab_name, date_str, badge_html in zip(
+        df_articles['title'], authors_text, final_tag, original_tag, tab, display_date, badges
+    ):
+        if pd.isna(title):
+            cards.append(None)
+            continue
+        if is_original:
+            tag_display = f"<span style='{ORIGINAL_TAG_STYLE}'>Original Tag: {tag}</span>"
+        else:
+            tag_display = f"<span style='font-size: 0.9em; color: {COLOR_MAP.get(tab_name, '#6c757d')};'>River Tag: {tag}</span>"
+        cards.append(card_html(title, authors_str, tag_display, date_str, badge_html))
+    return pd.Series(cards, index=df_articles.index, dtype=object)
+
+# ==========================
+# Dashboard data
+# ==========================
+def load_dashboard_data(digest_path=AI_DIGEST_FILE, articles_path=ARTICLES_FILE, known_rivers=()):
+    """Parse both CSVs once and derive everything the dashboard needs per data version.
+
+    Missing files raise FileNotFoundError; empty files produce empty frames plus a warning.
+    """
+    warnings = []
+    df_digest = load_digest(digest_path, warnings)
+    df_articles = load_articles(articles_path, warnings)
+
+    # --- Split Digest Data ---
+    df_digest_summary = df_digest.drop_duplicates(subset=['river'], keep='first')
+    min_date_str, max_date_str = date_range(df_articles)
+    summaries = summary_lookup(df_digest_summary)
+    df_articles['card_html'] = build_cards(df_articles, known_rivers)
+
+    return {
+        "articles": df_articles,
+        "digest_summary": df_digest_summary,
+        "summaries": summaries,
+        "river_index": build_river_index(df_articles, summaries, known_rivers),
+        "min_date": min_date_str,
+        "max_date": max_date_str,
+        "warnings": warnings
+    }
@@ -0,0 +1,51 @@
+import re
+import unicodedata
+
+# ==========================
+# Normalization helpers
+# ==========================
+PAPER_ID_RE = re.compile(r"/paper/(?:[^/]+/)?([0-9a-f]{40})", re.IGNORECASE)
+
+def normalize_title(title):
+    # Case, accents, punctuation and whitespace differences collapse to the same key
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.sub(r"[^\w\s]|_", " ", text).split())
+
+def paper_id_from_url(url):
+    match = PAPER_ID_RE.search(url or "")
+    return match.group(1).lower() if match else ""
+
+# ==========================
+# Dedup index
+# ==========================
+class DedupIndex:
+    """Hash index over normalized titles and Semantic Scholar paper IDs.
+
+    Built once from the corpus and updated as articles are added, so every
+    lookup is O(1) instead of a scan over the whole archive.
+    """
+
+    def __init__(self, articles=()):
+        self.titles = set()
+        self.paper_ids = set()
+        for a in articles:
+            self.add(a.get("title", ""), a.get("link", ""))
+
+    def contains(self, title, url=""):
+        paper_id = paper_id_from_url(url)
+        if paper_id and paper_id in self.paper_ids:
+            return True
+        key = normalize_title(title)
+        return bool(key) and key in self.titles
+
+    def add(self, title, url=""):
+        key = normalize_title(title)
+        if key:
+            self.titles.add(key)
+        paper_id = paper_id_from_url(url)
+        if paper_id:
+            self.paper_ids.add(paper_id)
+
+    def __len__(self):
+        return len(self.titles)
@@ -2,119 +2,80 @@ import streamlit as st
 import pandas as pd
 import folium
 from streamlit_folium import st_folium
+import copy
 import json
 import os
 import numpy as np 
-import re 
+import time
 from datetime import datetime 
 
+from dashboard_data import (
+    AI_DIGEST_FILE, ARTICLES_FILE, CENTER_MAP, COLOR_MAP, ZOOM_MAP,
+    build_cards, file_version, load_dashboard_data
+)
+from geo_bundle import GEO_BUNDLE_FILE, load_bundle
+from metrics import metrics
+from search_index import CORPUS_FILE, SEARCH_COLUMNS, STORED_COLUMNS, search, sync_index
+
 # ==========================
 # Configuration and Data
 # ==========================
-AI_DIGEST_FILE = "new_articles_digest_ai.csv" 
-ARTICLES_FILE = "new_articles_digest.csv"     
-
 GEOJSON_FOLDER = "geo"
+ARTICLES_PAGE_SIZE = 12  # cards built per page; a multiple of the 4 grid columns
+SEARCH_RESULTS_LIMIT = 48
 
-# River colors mapping
-COLOR_MAP = {
-    "Po": "#1f77b4",       # blue
-    "Adige": "#ff7f0e",    # orange
-    "Chiese": "#2ca02c",   # green
-    "Noce": "#9467bd",     # purple
-    "Sarca": "#8c564b",    # brown
-    "Brenta": "#e377c2",   # pink
-    "Avisio": "#7f7f7f"    # gray
-}
-
-# Map center coordinates for focused view
-CENTER_MAP = {
-    "Po": [45.0, 9.5],      
-    "Adige": [45.5, 11.0],  
-    "Chiese": [45.7, 10.5], 
-    "Noce": [46.3, 11.0],   
-    "Sarca": [46.0, 10.9],  
-    "Brenta": [45.6, 11.7], 
-    "Avisio": [46.3, 11.5], 
-    "Others": [43.5, 12.5], 
-    "default": [43.5, 12.5] 
-}
-
-# Map zoom levels
-ZOOM_MAP = {
-    "Po": 7,
-    "Adige": 8,
-    "Chiese": 9,
-    "Noce": 10,
-    "Sarca": 10,
-    "Brenta": 9,
-    "Avisio": 10,
-    "Others": 6,
-    "default": 6
-}
+# Every script run is one rerun span; it is exported when the script reaches the end
+rerun_started_at = time.time()
+rerun_start = time.perf_counter()
 
 # ==========================
 # Load Digest Data
 # ==========================
 known_rivers = list(COLOR_MAP.keys())
 
-# --- 1. Load Summary File ---
+# Resources keyed by a file version keep only the current one, so a long-running dashboard
+# does not hold every old corpus in memory
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_dashboard_data(digest_version, articles_version):
+    # Cached per file version; the frames are shared across reruns and treated as read-only
+    return load_dashboard_data(AI_DIGEST_FILE, ARTICLES_FILE, known_rivers)
+
+data_version = (file_version(AI_DIGEST_FILE), file_version(ARTICLES_FILE))
 try:
-    df_digest = pd.read_csv(AI_DIGEST_FILE)
-    df_digest.columns = df_digest.columns.str.strip() 
-except FileNotFoundError:
-    st.error(f"Error: File not found: {AI_DIGEST_FILE}. Please ensure the file exists.")
+    data = get_dashboard_data(*data_version)
+except FileNotFoundError as e:
+    st.error(f"Error: File not found: {e.filename}. Please ensure the file exists.")
     st.stop()
-except pd.errors.EmptyDataError:
-    st.warning(f"Warning: The file {AI_DIGEST_FILE} is empty. River summaries will be unavailable.")
-    df_digest = pd.DataFrame(columns=["river", "summary", "keywords"])
 
+for warning in data["warnings"]:
+    st.warning(warning)
 
-# --- 2. Load Articles File ---
-try:
-    # Use parse_dates to convert publicationDate column to datetime objects
-    df_articles = pd.read_csv(ARTICLES_FILE, parse_dates=['publicationDate'])
-    df_articles.columns = df_articles.columns.str.strip() 
-except FileNotFoundError:
-    st.error(f"Error: File not found: {ARTICLES_FILE}. Please ensure the file exists.")
-    st.stop()
-except pd.errors.EmptyDataError:
-    st.warning(f"Warning: The file {ARTICLES_FILE} is empty. Article listings will be unavailable.")
-    df_articles = pd.DataFrame(columns=['title', 'abstract', 'link', 'river', 'year', 'authors', 'keywords', 'publicationDate'])
-    
-# Check for required columns in df_articles and initialize if missing
-required_cols = ['title', 'abstract', 'link', 'river', 'year', 'authors', 'keywords', 'publicationDate']
-for col in required_cols:
-    if col not in df_articles.columns:
-        df_articles[col] = np.nan
-    
-# --- Extract and Calculate Date Range from publicationDate ---
-min_date_str = "N/A"
-max_date_str = "N/A"
-DATE_FORMAT = "%d %b %Y" # Format: 10 Dec 2025
-
-if 'publicationDate' in df_articles.columns and not df_articles.empty:
-    # Drop NaT (Not a Time) values resulting from parsing errors
-    dates = df_articles['publicationDate'].dropna()
-    
-    if not dates.empty:
-        min_date = dates.min()
-        max_date = dates.max()
-        
-        # Format dates to string
-        min_date_str = min_date.strftime(DATE_FORMAT)
-        max_date_str = max_date.strftime(DATE_FORMAT)
-
-# --- Split Digest Data ---
-df_digest_summary = df_digest.drop_duplicates(subset=['river'], keep='first')
+df_articles = data["articles"]
+river_index = data["river_index"]
+min_date_str = data["min_date"]
+max_date_str = data["max_date"]
     
 tab_names = known_rivers + ["Others"]
 
 # ==========================
 # GeoJSON Loading Function
 # ==========================
+@st.cache_data
+def load_geo_bundle():
+    # Simplified, quantized geometries for every river (built by `python geo_bundle.py`)
+    if not os.path.exists(GEO_BUNDLE_FILE):
+        return {}
+    try:
+        return load_bundle(GEO_BUNDLE_FILE)
+    except (json.JSONDecodeError, ValueError, KeyError):
+        st.warning("Error decoding the GeoJSON bundle, falling back to full-resolution files.")
+        return {}
+
 @st.cache_data
 def load_geojson(river_name):
+    bundled = load_geo_bundle().get(river_name)
+    if bundled:
+        return bundled
     path = os.path.join(GEOJSON_FOLDER, f"{river_name}.geojson")
     if not os.path.exists(path):
         return None
@@ -139,6 +100,135 @@ def style_function_factory(r_color, is_active=False):
         }
     return style
 
+# ==========================
+# Map Layers
+# ==========================
+def river_popup(river, color):
+    entry = river_index[river]
+    summary = entry["summary"] if entry["has_digest"] else "No new reports."
+    popup_html = f"""
+        <div style="font-family:Arial;">
+            <h4 style="margin:0; color:{color}; font-weight:700;">{river}</h4>
+            <div style="
+                max-height:120px; 
+                overflow-y:auto; 
+                font-size:13px; 
+                line-height:1.3;
+                word-wrap: break-word;
+                white-space: normal;
+            ">
+                {summary}
+            </div>
+        </div>
+        """
+    return folium.Popup(popup_html, max_width=300)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def build_base_map(data_version):
+    # All river layers in their inactive style; built once per data version
+    m = folium.Map(location=CENTER_MAP["default"], zoom_start=ZOOM_MAP["default"])
+    for river in known_rivers:
+        geo = load_geojson(river)
+        if not geo:
+            continue
+
+        color = COLOR_MAP.get(river, "#3388ff")
+        folium.GeoJson(
+            geo,
+            name=river,
+            tooltip=river,
+            popup=river_popup(river, color),
+            style_function=style_function_factory(color, False),
+            highlight_function=lambda feature: {"weight":5, "fillOpacity":0.7}
+        ).add_to(m)
+
+    folium.LayerControl().add_to(m)
+    return m
+
+@st.cache_resource(show_spinner=False, max_entries=8)  # one per river (7) of the current data version
+def build_focus_layer(river, data_version):
+    # Active style and focus marker for the selected river, drawn on top of the base map
+    fg = folium.FeatureGroup(name=f"{river} (focus)")
+    geo = load_geojson(river) if river in known_rivers else None
+    if not geo:
+        return fg
+
+    color = COLOR_MAP.get(river, "#3388ff")
+    folium.GeoJson(
+        geo,
+        tooltip=river,
+        popup=river_popup(river, color),
+        style_function=style_function_factory(color, True),
+        highlight_function=lambda feature: {"weight":5, "fillOpacity":0.7}
+    ).add_to(fg)
+
+    try:
+        if geo["features"]:
+            feature = geo["features"][0]
+            coords = feature["geometry"]["coordinates"]
+            geom_type = feature["geometry"]["type"]
+            if geom_type == "Point":
+                lat, lon = coords[1], coords[0]
+            elif geom_type == "LineString":
+                lat, lon = coords[0][1], coords[0][0]
+            else:
+                return fg
+
+            folium.CircleMarker(
+                location=(lat, lon),
+                radius=8,
+                color=color,
+                weight=2,
+                fill=True,
+                fill_color=color,
+                fill_opacity=1,
+                tooltip=f"{river} (ACTIVE FOCUS)"
+            ).add_to(fg)
+    except Exception:
+        pass
+    return fg
+
+# ==========================
+# Article Cards
+# ==========================
+def render_article_cards(cards_data):
+    # Set to 4 columns
+    cols = st.columns(4) 
+    
+    # Card HTML is prebuilt once per data version; only the widgets are created here
+    for i, (card, article_summary, link) in enumerate(cards_data[['card_html', 'abstract', 'link']].itertuples(index=False)):
+        if card is None:
+            continue
+
+        with cols[i % 4]:
+            with st.container(border=True): # <--- This container gets the min-height CSS
+                st.markdown(card, unsafe_allow_html=True)
+                
+                with st.expander("Show Abstract"):
+                    if pd.notna(article_summary):
+                        st.markdown(article_summary) 
+                    
+                if link and pd.notna(link):
+                    st.link_button("Read Full Article (External Link)", url=link, type="primary", use_container_width=True)
+
+# ==========================
+# Archive Search
+# ==========================
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_search_index(corpus_version):
+    # Synced (incrementally) once per corpus version; queries then hit the FTS5 index only.
+    # The connection of an evicted version is closed when it is garbage-collected
+    return sync_index(CORPUS_FILE)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def search_corpus(query, corpus_version):
+    results, elapsed = search(get_search_index(corpus_version), query, limit=SEARCH_RESULTS_LIMIT)
+    df_results = pd.DataFrame(results, columns=SEARCH_COLUMNS + STORED_COLUMNS)
+    df_results = df_results.replace("", np.nan)
+    df_results['publicationDate'] = pd.to_datetime(df_results['publicationDate'], errors='coerce')
+    df_results['card_html'] = build_cards(df_results, known_rivers)
+    return df_results, elapsed
+
 # ==========================
 # Streamlit Layout
 # ==========================
@@ -175,11 +265,19 @@ if 'active_river' not in st.session_state:
 if 'scroll_flag' not in st.session_state:
     st.session_state.scroll_flag = False
 
+if 'visible_articles' not in st.session_state:
+    st.session_state.visible_articles = {}
+
 def set_active_river(river_name):
     # Set active river and scroll flag
     st.session_state.active_river = river_name
     st.session_state.scroll_flag = True 
 
+def show_more_articles(river_name):
+    # Grow the visible slice of this river's article grid by one page
+    visible = st.session_state.visible_articles.get(river_name, ARTICLES_PAGE_SIZE)
+    st.session_state.visible_articles[river_name] = visible + ARTICLES_PAGE_SIZE
+
 # --------------------
 # 1. Top Row (Map and Digest)
 # --------------------
@@ -192,73 +290,26 @@ with col_map:
     current_focus_river = st.session_state.active_river
     center = CENTER_MAP.get(current_focus_river, CENTER_MAP["default"])
     zoom = ZOOM_MAP.get(current_focus_river, ZOOM_MAP["default"])
-    m = folium.Map(location=center, zoom_start=zoom)
-
-    # Use df_digest_summary for the map popups
-    for river in known_rivers:
-        geo = load_geojson(river)
-        if not geo:
-            continue
-
-        color = COLOR_MAP.get(river, "#3388ff")
-        digest_row = df_digest_summary[df_digest_summary["river"]==river]
-        summary = digest_row["summary"].values[0] if not digest_row.empty else "No new reports."
-        is_active = river == current_focus_river
-
-        popup_html = f"""
-        <div style="font-family:Arial;">
-            <h4 style="margin:0; color:{color}; font-weight:700;">{river}</h4>
-            <div style="
-                max-height:120px; 
-                overflow-y:auto; 
-                font-size:13px; 
-                line-height:1.3;
-                word-wrap: break-word;
-                white-space: normal;
-            ">
-                {summary}
-            </div>
-        </div>
-        """
 
-        river_geojson = folium.GeoJson(
-            geo,
-            name=river,
-            tooltip=river,
-            popup=folium.Popup(popup_html, max_width=300),
-            style_function=style_function_factory(color, is_active),
-            highlight_function=lambda feature: {"weight":5, "fillOpacity":0.7}
-        )
-        river_geojson.add_to(m)
-
-        if is_active:
-            try:
-                if geo["features"]:
-                    feature = geo["features"][0]
-                    coords = feature["geometry"]["coordinates"]
-                    geom_type = feature["geometry"]["type"]
-                    if geom_type == "Point":
-                        lat, lon = coords[1], coords[0]
-                    elif geom_type == "LineString":
-                        lat, lon = coords[0][1], coords[0][0]
-                    else:
-                        continue
-
-                    folium.CircleMarker(
-                        location=(lat, lon),
-                        radius=8,
-                        color=color,
-                        weight=2,
-                        fill=True,
-                        fill_color=color,
-                        fill_opacity=1,
-                        tooltip=f"{river} (ACTIVE FOCUS)"
-                    ).add_to(m)
-            except Exception:
-                pass
-            
-    folium.LayerControl().add_to(m)
-    st_folium(m, width=900, height=fixed_height, returned_objects=[])
+    # The base map is serialized once per data version; only center, zoom and the
+    # focus layer change per interaction, so st_folium updates the view in place
+    base_map = build_base_map(data_version)
+    focus_layer = build_focus_layer(current_focus_river, data_version)
+
+    # st_folium attaches the feature group to the map it is given; a shallow copy
+    # with its own children dict keeps the cached base map unchanged between reruns
+    view_map = copy.copy(base_map)
+    view_map._children = base_map._children.copy()
+    st_folium(
+        view_map,
+        key="river_map",
+        center=center,
+        zoom=zoom,
+        feature_group_to_add=focus_layer,
+        width=900,
+        height=fixed_height,
+        returned_objects=[]
+    )
 
 # --------------------
 # Right Column: Digest Tabs
@@ -289,16 +340,15 @@ with col_digest:
             with st.container(): 
                 
                 # Get summary and keywords
-                summary_data = df_digest_summary[df_digest_summary["river"] == current_river]
-                general_summary = summary_data["summary"].values[0] if not summary_data.empty else "No new reports for this river."
+                summary_data = river_index[current_river]
+                general_summary = summary_data["summary"] if summary_data["has_digest"] else "No new reports for this river."
                 
                 st.markdown("##### 📝 General Summary")
                 st.markdown(general_summary)
                 
                 # Category Keywords (from AI_DIGEST_FILE)
-                keywords_row = df_digest_summary[df_digest_summary["river"] == current_river]
-                if not keywords_row.empty:
-                    kws = keywords_row['keywords'].values[0]
+                if summary_data["has_digest"]:
+                    kws = summary_data['keywords']
                     if kws and pd.notna(kws):
                         kw_list = [kw.strip() for kw in str(kws).split(";")]
                         st.markdown("---")
@@ -320,161 +370,55 @@ st.markdown(f"## 📚 Articles Related to {st.session_state.active_river}")
 active_river = st.session_state.active_river
 articles_data = pd.DataFrame()
 
-if not df_articles.empty:
-    if active_river == "Others":
-        # Filter articles where 'river' is NOT in the list of known rivers
-        articles_data = df_articles[~df_articles['river'].isin(known_rivers)].copy()
-    elif active_river in known_rivers:
-        # Filter articles by the active river
-        articles_data = df_articles[df_articles['river'] == active_river].copy()
+if not df_articles.empty and active_river in river_index:
+    # Row positions were precomputed per data version ("Others" = river not in known_rivers)
+    articles_data = df_articles.iloc[river_index[active_river]["rows"]]
 
 # --- Display Articles (stable st.columns(4)) ---
 if not articles_data.empty:
-    # Set to 4 columns
-    cols = st.columns(4) 
-    
-    for idx, row in articles_data.iterrows():
-        col = cols[idx % 4] 
-        
-        with col:
-            title = row.get('title', 'N/A Title')
-            article_summary = row.get('abstract', 'No summary available.') 
-            link = row.get('link')
-            year = row.get('year', 'N/A')
-            authors = row.get('authors', 'N/A')
-            
-            # Individual article keywords (from ARTICLES_FILE, column 'keywords')
-            article_keywords_raw = row.get('keywords') 
-            
-            # River tag handling
-            river_tag_raw = row.get('river')
-            if pd.isna(river_tag_raw) or river_tag_raw == 'N/A':
-                final_tag = active_river
-            else:
-                final_tag = river_tag_raw
-
-            # Date formatting (uses publicationDate if available)
-            display_date = str(year)
-            if 'publicationDate' in row and pd.notna(row['publicationDate']):
-                try:
-                    # Use accurate year from date if 'year' is undefined
-                    if pd.isna(year):
-                        year = row['publicationDate'].year
-                    
-                    # Format the date for display
-                    display_date = row['publicationDate'].strftime("%d %b %Y") # e.g., 10 Dec 2025
-                    
-                except AttributeError:
-                    # Fallback to year if parsing fails
-                    pass
-                
-            if pd.isna(title):
-                continue
-                
-            with st.container(border=True): # <--- This container gets the min-height CSS
-                
-                # --- Заголовок: Горизонтальная прокрутка ---
-                st.markdown(f"""
-                <h4 style="
-                    white-space: nowrap; 
-                    overflow-x: auto; 
-                    overflow-y: hidden;
-                    margin-top: 0;
-                    margin-bottom: 5px;
-                ">
-                {title}
-                </h4>
-                """, unsafe_allow_html=True)
-                
-                # --- Авторы: Горизонтальная прокрутка (ВСЕГДА ВЫВОДИМ) ---
-                # Получаем чистый текст авторов или 'N/A'
-                authors_text = authors if pd.notna(authors) and authors != 'N/A' else 'N/A'
-                
-                # Вставляем чистый текст, используя HTML-теги <b> и <i> вместо Markdown ** и *
-                st.markdown(f"""
-                <div style="
-                    white-space: nowrap; 
-                    overflow-x: auto; 
-                    overflow-y: hidden;
-                    margin-bottom: 5px;
-                ">
-                    <b>Authors:</b> <i>{authors_text}</i>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # --- Тег/Дата: Горизонтальная прокрутка (ВСЕГДА ВЫВОДИМ) ---
-                if active_river == "Others" and final_tag != "Others":
-                    tag_display = f"<span style='background-color: #e0e0e0; color: #444; padding: 2px 6px; border-radius: 3px; font-weight: 500; font-size: 0.9em;'>Original Tag: {final_tag}</span>"
-                else:
-                    tag_display = f"<span style='font-size: 0.9em; color: {COLOR_MAP.get(active_river, '#6c757d')};'>River Tag: {final_tag}</span>"
-
-                st.markdown(f"""
-                <p style='margin-bottom: 5px; white-space: nowrap; overflow-x: auto; overflow-y: hidden;'>
-                    {tag_display} ({display_date})
-                </p>
-                """, unsafe_allow_html=True)
-                
-                # --- Ключевые слова: Горизонтальная прокрутка (ВОЗВРАЩАЕМ СТИЛИ) ---
-                
-                article_keywords_formatted = ""
-                keywords_list = []
-                
-                if pd.notna(article_keywords_raw) and article_keywords_raw:
-                    kw_str = str(article_keywords_raw).strip()
-                    
-                    # 1. Deep cleaning: remove unwanted start/end chars (quotes, extra whitespace)
-                    kw_str = re.sub(r'^[\s"\'\-]+|[\s"\'\-]+$', '', kw_str) 
-                    
-                    # 2. Parsing logic: Prioritize ; then , then treat as single string
-                    if ';' in kw_str:
-                        keywords_list = [kw.strip() for kw in kw_str.split(';') if kw.strip()]
-                    elif ',' in kw_str:
-                        keywords_list = [kw.strip() for kw in kw_str.split(',') if kw.strip()]
-                    else:
-                        if kw_str:
-                            keywords_list = [kw_str]
-                
-                # Badge style: reduced size and nowrap for better fit
-                badge_style = "background-color: #e8e8e8; color: #333; padding: 2px 5px; border-radius: 4px; font-size: 0.75em; margin-right: 5px; margin-bottom: 5px; display: inline-block; white-space: nowrap;"
-                
-                if keywords_list:
-                    for kw in keywords_list:
-                        final_kw = kw.strip()
-                        if final_kw:
-                            # Apply styling as a badge
-                            article_keywords_formatted += f"<span style='{badge_style}'>{final_kw}</span>"
-                
-                # Если ключевых слов нет или они пустые, выводим N/A (без стилизации баджей, просто текст)
-                if not article_keywords_formatted:
-                     article_keywords_formatted = "N/A"
-                     
-                # Wrap keywords in a div for horizontal scroll
-                # Используем <b> для "Keywords:"
-                st.markdown(f"""
-                <div style="
-                    margin-top: 5px; 
-                    margin-bottom: 0; 
-                    white-space: nowrap; 
-                    overflow-x: auto; 
-                    overflow-y: hidden;
-                ">
-                    <b>Keywords:</b> {article_keywords_formatted}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("---")
-                
-                with st.expander("Show Abstract"):
-                    if pd.notna(article_summary):
-                        st.markdown(article_summary) 
-                    
-                if link and pd.notna(link):
-                    st.link_button("Read Full Article (External Link)", url=link, type="primary", use_container_width=True)
+    # Only the visible page(s) of cards are built; "Load more" extends the slice
+    total_articles = len(articles_data)
+    visible_articles = st.session_state.visible_articles.get(active_river, ARTICLES_PAGE_SIZE)
+    page_data = articles_data.iloc[:visible_articles]
+
+    render_article_cards(page_data)
+
+    st.caption(f"Showing {len(page_data)} of {total_articles} articles")
+    if visible_articles < total_articles:
+        st.button(
+            f"Load {min(ARTICLES_PAGE_SIZE, total_articles - visible_articles)} more articles",
+            key=f"more_{active_river}",
+            on_click=show_more_articles,
+            args=(active_river,),
+            use_container_width=True
+        )
 else:
     st.info(f"No individual articles found for **{active_river}**.")
     
 # --------------------
-# 3. SCROLL LOGIC
+# 3. Archive Search
+# --------------------
+st.divider()
+st.markdown("## 🔎 Search the Article Archive")
+
+search_query = st.text_input(
+    "Search titles, abstracts, authors and keywords across all scraped articles",
+    key="search_query",
+    placeholder="e.g. SPEI groundwater Adige"
+)
+if search_query.strip():
+    if os.path.exists(CORPUS_FILE):
+        search_results, search_time = search_corpus(search_query.strip(), file_version(CORPUS_FILE))
+        st.caption(f"{len(search_results)} results in {search_time * 1000:.1f} ms (best matches first)")
+        if search_results.empty:
+            st.info(f"No articles match **{search_query}**.")
+        else:
+            render_article_cards(search_results)
+    else:
+        st.warning(f"Search is unavailable: {CORPUS_FILE} not found.")
+
+# --------------------
+# 4. SCROLL LOGIC
 # --------------------
 if st.session_state.scroll_flag:
     scroll_script = """
@@ -488,4 +432,14 @@ if st.session_state.scroll_flag:
     </script>
     """
     st.markdown(scroll_script, unsafe_allow_html=True)
-    st.session_state.scroll_flag = False
\ No newline at end of file
+    st.session_state.scroll_flag = False
+
+# --------------------
+# 5. Rerun metrics
+# --------------------
+metrics.record(
+    "streamlit_rerun", rerun_started_at, time.perf_counter() - rerun_start,
+    attrs={"river": active_river, "river_articles": len(articles_data), "search": bool(search_query.strip())}
+)
+metrics.inc("streamlit_reruns_total")
+metrics.export_every("dashboard")
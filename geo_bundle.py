@@ -0,0 +1,169 @@
+import json
+import os
+
+# ==========================
+# Settings
+# ==========================
+GEOJSON_FOLDER = "geo"
+GEO_BUNDLE_FILE = os.path.join(GEOJSON_FOLDER, "rivers.bundle.json")
+BUNDLE_FORMAT = "rivers-bundle/1"
+
+# Coordinates are stored as integers on a 1e-4 degree grid (~10 m), delta-encoded
+QUANTIZATION = 10000
+# Simplification tolerance in screen pixels at the river's focus zoom
+TOLERANCE_PIXELS = 0.75
+
+# ==========================
+# Simplification
+# ==========================
+def zoom_tolerance(zoom, pixels=TOLERANCE_PIXELS):
+    # Degrees of longitude covered by one 256px-tile pixel at this zoom level
+    return 360.0 / (256 * 2 ** zoom) * pixels
+
+def _segment_distance(p, a, b):
+    (x, y), (x1, y1), (x2, y2) = p, a, b
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+    px, py = x1 + t * dx, y1 + t * dy
+    return ((x - px) ** 2 + (y - py) ** 2) ** 0.5
+
+def douglas_peucker(points, tolerance):
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        max_dist = 0.0
+        index = None
+        for i in range(start + 1, end):
+            dist = _segment_distance(points[i], points[start], points[end])
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [p for p, k in zip(points, keep) if k]
+
+def simplify_line(points, tolerance, closed=False):
+    if closed:
+        # Split the ring at its farthest point so both halves keep a real anchor
+        far = max(range(len(points)), key=lambda i: _segment_distance(points[i], points[0], points[0]))
+        first = douglas_peucker(points[:far + 1], tolerance)
+        second = douglas_peucker(points[far:], tolerance)
+        simplified = first[:-1] + second
+        if len(simplified) < 4:
+            simplified = points[:3] + [points[0]] if len(points) >= 4 else points
+        return simplified
+    simplified = douglas_peucker(points, tolerance)
+    return simplified if len(simplified) >= 2 else points[:2]
+
+# ==========================
+# Quantized encoding
+# ==========================
+def encode_line(points):
+    # [x0, y0, dx1, dy1, ...] on the integer grid; repeated grid points are dropped
+    encoded = []
+    prev = None
+    for x, y in points:
+        q = (round(x * QUANTIZATION), round(y * QUANTIZATION))
+        if q == prev:
+            continue
+        if prev is None:
+            encoded.extend(q)
+        else:
+            encoded.extend((q[0] - prev[0], q[1] - prev[1]))
+        prev = q
+    return encoded
+
+def decode_line(encoded):
+    points = []
+    x = y = 0
+    for i in range(0, len(encoded), 2):
+        x += encoded[i]
+        y += encoded[i + 1]
+        points.append([x / QUANTIZATION, y / QUANTIZATION])
+    return points
+
+def encode_geometry(geometry, tolerance):
+    gtype = geometry["type"]
+    coords = geometry["coordinates"]
+    if gtype == "Point":
+        return {"type": gtype, "lines": [encode_line([coords])]}
+    if gtype == "LineString":
+        return {"type": gtype, "lines": [encode_line(simplify_line(coords, tolerance))]}
+    if gtype in ("Polygon", "MultiLineString"):
+        closed = gtype == "Polygon"
+        return {"type": gtype, "lines": [encode_line(simplify_line(l, tolerance, closed)) for l in coords]}
+    if gtype == "MultiPolygon":
+        return {"type": gtype, "parts": [[encode_line(simplify_line(r, tolerance, True)) for r in poly] for poly in coords]}
+    raise ValueError(f"Unsupported geometry type: {gtype}")
+
+def decode_geometry(encoded):
+    gtype = encoded["type"]
+    if gtype == "Point":
+        return {"type": gtype, "coordinates": decode_line(encoded["lines"][0])[0]}
+    if gtype == "LineString":
+        return {"type": gtype, "coordinates": decode_line(encoded["lines"][0])}
+    if gtype in ("Polygon", "MultiLineString"):
+        return {"type": gtype, "coordinates": [decode_line(l) for l in encoded["lines"]]}
+    return {"type": gtype, "coordinates": [[decode_line(r) for r in poly] for poly in encoded["parts"]]}
+
+# ==========================
+# Bundle build / load
+# ==========================
+def build_bundle(rivers, zoom_map, folder=GEOJSON_FOLDER):
+    bundle = {"format": BUNDLE_FORMAT, "quantization": QUANTIZATION, "rivers": {}}
+    for river in rivers:
+        path = os.path.join(folder, f"{river}.geojson")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            geo = json.load(f)
+        zoom = zoom_map.get(river, zoom_map["default"])
+        tolerance = zoom_tolerance(zoom)
+        bundle["rivers"][river] = {
+            "zoom": zoom,
+            "features": [
+                {"properties": feature.get("properties") or {}, "geometry": encode_geometry(feature["geometry"], tolerance)}
+                for feature in geo.get("features", [])
+                if feature.get("geometry")
+            ]
+        }
+    return bundle
+
+def decode_bundle(bundle):
+    if bundle.get("format") != BUNDLE_FORMAT or bundle.get("quantization") != QUANTIZATION:
+        raise ValueError(f"Unsupported geo bundle format: {bundle.get('format')}")
+    return {
+        river: {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": feature["properties"], "geometry": decode_geometry(feature["geometry"])}
+                for feature in data["features"]
+            ]
+        }
+        for river, data in bundle["rivers"].items()
+    }
+
+def load_bundle(path=GEO_BUNDLE_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return decode_bundle(json.load(f))
+
+def write_bundle(bundle, path=GEO_BUNDLE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, separators=(",", ":"))
+
+if __name__ == "__main__":
+    from dashboard_data import COLOR_MAP, ZOOM_MAP
+
+    bundle = build_bundle(list(COLOR_MAP.keys()), ZOOM_MAP)
+    write_bundle(bundle)
+    source_size = sum(os.path.getsize(os.path.join(GEOJSON_FOLDER, f"{r}.geojson")) for r in bundle["rivers"])
+    print(f"✅ Wrote {GEO_BUNDLE_FILE}: {len(bundle['rivers'])} rivers, "
+          f"{os.path.getsize(GEO_BUNDLE_FILE) / 1024:.1f} KiB (from {source_size / 1024:.1f} KiB of GeoJSON)")
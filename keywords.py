@@ -0,0 +1,174 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import yake
+from tqdm import tqdm
+
+from cache import CACHE_DIR, SQLiteCache, make_key
+from metrics import metrics
+
+# ==========================
+# Settings
+# ==========================
+YAKE_CONFIG = {
+    "lan": "en",
+    "n": 3,
+    "top": 7,
+    "dedupLim": 0.9,
+    "dedupFunc": "seqSimilarity",
+    "windowsSize": 2
+}
+RELEVANT_TERMS = [
+    "drought", "water", "river", "basin", "irrigation", "scarcity", 
+    "flow", "hydrology", "climate", "precipitation", "flooding", 
+    "water stress", "sustainability", "water management", 
+    "groundwater", "evaporation", "runoff", "conservation", 
+    "water quality", "ecosystem", "water conservation", "resource management"
+    ]
+
+KEYWORD_WORKERS = os.cpu_count() or 1
+CHUNK_SIZE = 32  # abstracts sent to a worker at a time
+
+CORPUS_FILE = "semantic_scholar_results.csv"
+
+# Raw scored YAKE output per (abstract hash, extractor config hash)
+KEYWORD_CACHE_FILE = os.path.join(CACHE_DIR, "keywords.sqlite")
+KEYWORD_CACHE_MAX_BYTES = 256 * 1024 * 1024
+CONFIG_HASH = make_key("yake", getattr(yake, "__version__", ""), YAKE_CONFIG)
+
+# ==========================
+# Relevant-term filter
+# ==========================
+def compile_terms(terms):
+    # One case-insensitive alternation instead of lowercasing every term for every keyword
+    alternatives = sorted({t.lower() for t in terms}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(t) for t in alternatives), re.IGNORECASE)
+
+RELEVANT_RE = compile_terms(RELEVANT_TERMS)
+
+def filter_keywords(scored_keywords, pattern=RELEVANT_RE):
+    return [kw for kw, score in scored_keywords if pattern.search(kw)]
+
+# ==========================
+# YAKE workers
+# ==========================
+_extractor = None
+
+def _init_worker():
+    global _extractor
+    _extractor = yake.KeywordExtractor(**YAKE_CONFIG)
+
+def _extract_chunk(abstracts):
+    if _extractor is None:
+        _init_worker()
+    # Per-abstract timings travel back with the results; workers have no metrics registry
+    results = []
+    for a in abstracts:
+        start = time.perf_counter()
+        results.append((_extractor.extract_keywords(a) if a else [], time.perf_counter() - start))
+    return results
+
+def extract_scored(abstracts, workers=KEYWORD_WORKERS, chunk_size=CHUNK_SIZE):
+    chunks = [abstracts[i:i + chunk_size] for i in range(0, len(abstracts), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [_extract_chunk(chunk) for chunk in tqdm(chunks, unit="chunk")]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker) as pool:
+            results = list(tqdm(pool.map(_extract_chunk, chunks), total=len(chunks), unit="chunk"))
+    scored = []
+    for chunk in results:
+        for kws, seconds in chunk:
+            metrics.observe("yake_extract_seconds", seconds)
+            scored.append(kws)
+    return scored
+
+# ==========================
+# Keyword cache
+# ==========================
+_cache = None
+
+def get_cache():
+    # Opened lazily so pool workers never touch the SQLite file
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache(KEYWORD_CACHE_FILE, max_bytes=KEYWORD_CACHE_MAX_BYTES)
+    return _cache
+
+def abstract_key(abstract):
+    abstract_hash = hashlib.sha256(abstract.encode("utf-8")).hexdigest()
+    return make_key(abstract_hash, CONFIG_HASH)
+
+def cached_scored(abstracts, workers=KEYWORD_WORKERS, chunk_size=CHUNK_SIZE):
+    cache = get_cache()
+    keys = [abstract_key(a) if a else None for a in abstracts]
+    scored = [None] * len(abstracts)
+    missing = {}
+    hits = 0
+    for i, (abstract, key) in enumerate(zip(abstracts, keys)):
+        if key is None:
+            scored[i] = []
+            continue
+        cached = cache.get(key)
+        if cached is not None:
+            scored[i] = json.loads(cached)
+            hits += 1
+        else:
+            # Identical abstracts in one batch are extracted once
+            missing.setdefault(abstract, []).append(i)
+
+    if missing:
+        todo = list(missing)
+        entries = []
+        for abstract, kws in zip(todo, extract_scored(todo, workers, chunk_size)):
+            kws = [[kw, score] for kw, score in kws]
+            entries.append((abstract_key(abstract), json.dumps(kws)))
+            for i in missing[abstract]:
+                scored[i] = kws
+        # One transaction for the whole batch instead of one per abstract
+        cache.set_many(entries, tag=CONFIG_HASH)
+    return scored, hits
+
+# ==========================
+# Keyword extraction stage
+# ==========================
+def extract_keywords(articles, workers=KEYWORD_WORKERS, chunk_size=CHUNK_SIZE):
+    if not articles:
+        return articles
+    start = time.perf_counter()
+    with metrics.span("yake_batch") as span:
+        abstracts = [a.get("abstract", "") or "" for a in articles]
+        scored, hits = cached_scored(abstracts, workers, chunk_size)
+        for article, kws in zip(articles, scored):
+            article["keywords"] = ", ".join(filter_keywords(kws))
+        span.update(abstracts=len(articles), cache_hits=hits, workers=workers)
+    metrics.inc("yake_abstracts_total", len(articles) - hits, source="yake")
+    metrics.inc("yake_abstracts_total", hits, source="cache")
+
+    elapsed = time.perf_counter() - start
+    rate = len(articles) / elapsed if elapsed > 0 else float("inf")
+    print(f"🔑 Extracted keywords for {len(articles)} abstracts in {elapsed:.1f}s ({rate:.1f} abstracts/s, {hits} from cache)")
+    return articles
+
+# ==========================
+# Corpus backfill
+# ==========================
+def backfill(csv_path=CORPUS_FILE):
+    # Re-filters the whole corpus; only abstracts never seen with this YAKE config hit YAKE
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        articles = list(reader)
+    extract_keywords(articles)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(articles)
+    print(f"✅ Backfilled keywords for {len(articles)} articles in {csv_path}")
+
+if __name__ == "__main__":
+    backfill()
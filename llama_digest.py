@@ -1,42 +1,196 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import ollama
 import csv
+import os
+import re
+import threading
+import time
+
+from cache import CACHE_DIR, SQLiteCache, make_key
+from metrics import metrics
 
 INPUT_FILE = "new_articles_digest.csv"
 OUTPUT_FILE = "new_articles_digest_ai.csv"
 
 LLAMA_MODEL = "llama3"
+LLAMA_OPTIONS = {
+    "temperature": 0.2,
+    "num_ctx": 5000,
+    "num_predict": 350
+}
+
+# Streaming stops as soon as the digest is long enough
+MAX_SENTENCES = 3
+MAX_CHARS = 1200
+SENTENCE_END_RE = re.compile(r"[.!?](?=\s|$)")
+ABBREVIATIONS_RE = re.compile(r"\b(?:e\.g|i\.e|et al|vs|approx|Fig|Eq)\.", re.IGNORECASE)
+# [Title](URL) links; an unclosed link at the end of a partial stream is masked too
+MARKDOWN_LINK_RE = re.compile(r"\[[^\]]*(?:\](?:\([^)]*\)?)?)?")
+STOP_BUDGET = {"max_sentences": MAX_SENTENCES, "max_chars": MAX_CHARS}
+
+# Generated summaries keyed by (model, options, prompt); tagged with the model name
+SUMMARY_CACHE_FILE = os.path.join(CACHE_DIR, "summaries.sqlite")
+summary_cache = SQLiteCache(SUMMARY_CACHE_FILE)
+
+# Prompts in flight at once; match the server's OLLAMA_NUM_PARALLEL
+LLM_MAX_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+llm_slots = threading.BoundedSemaphore(max(LLM_MAX_PARALLEL, 1))
+
+# Rough token estimate (no tokenizer for llama3 here); errs on the side of smaller batches
+CHARS_PER_TOKEN = 3.5
+CONTEXT_MARGIN = 200  # tokens kept free for chat template / tokenizer drift
+
+# Honors OLLAMA_HOST, so a local fake server can stand in for Ollama
+client = ollama.Client()
 
 def load_articles():
     with open(INPUT_FILE, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         return list(reader)
 
-def ask_llama(prompt):
+# Per-call generation stats: time to first token, tokens, tokens/sec
+llm_calls = []
+llm_calls_lock = threading.Lock()
+
+def sentence_ends(text):
+    # Links and abbreviations are masked (same length) so "et al." or a "?" in a title does not end a sentence
+    masked = MARKDOWN_LINK_RE.sub(lambda m: "_" * len(m.group(0)), text)
+    masked = ABBREVIATIONS_RE.sub(lambda m: "_" * len(m.group(0)), masked)
+    return [m.end() for m in SENTENCE_END_RE.finditer(masked)]
+
+def trim_to_budget(text):
+    ends = sentence_ends(text)
+    if len(ends) >= MAX_SENTENCES:
+        text = text[:ends[MAX_SENTENCES - 1]]
+    if len(text) > MAX_CHARS:
+        fitting = [e for e in ends if e <= MAX_CHARS]
+        text = text[:fitting[-1]] if fitting else text[:MAX_CHARS]
+    return text
+
+def budget_reached(text):
+    # A "." at the very end may still be a decimal point, so wait for the next token
+    complete = [e for e in sentence_ends(text) if e < len(text)]
+    return len(text) >= MAX_CHARS or len(complete) >= MAX_SENTENCES
+
+def stream_generate(prompt):
+    start = time.perf_counter()
+    first_token_at = None
+    text = ""
+    chunks = 0
+    final = None
+    stream = client.generate(model=LLAMA_MODEL, prompt=prompt, options=LLAMA_OPTIONS, stream=True)
     try:
-        response = ollama.generate(
-            model=LLAMA_MODEL,
-            prompt=prompt,
-            options={
-                "temperature": 0.2,
-                "num_ctx": 5000,
-                "num_predict": 350
-            }
-        )
-        return response["response"].strip()
-    except Exception as e:
-        print(f"⚠️ LLaMA error: {e}")
-        return ""
+        for chunk in stream:
+            piece = chunk["response"] or ""
+            if piece and first_token_at is None:
+                first_token_at = time.perf_counter()
+            text += piece
+            chunks += 1
+            if chunk["done"]:
+                final = chunk
+                break
+            if budget_reached(text):
+                break
+    finally:
+        # Closing the stream drops the connection, which makes Ollama stop decoding
+        stream.close()
 
-def process_river_articles(river, articles):
-    parts = []
-    for a in articles:
-        title = a.get("title", "")
-        abstract = a.get("abstract", "")
-        link = a.get("link", "")
-        parts.append(f"[{title}]({link})\n\n{abstract}")
-    joined = "\n\n".join(parts)
-    prompt = f"""
+    elapsed = time.perf_counter() - start
+    ttft = (first_token_at - start) if first_token_at else elapsed
+    if final is not None and final.get("eval_count") and final.get("eval_duration"):
+        tokens = final["eval_count"]
+        tokens_per_sec = tokens / (final["eval_duration"] / 1e9)
+    else:
+        tokens = chunks
+        decode_time = elapsed - ttft
+        tokens_per_sec = tokens / decode_time if decode_time > 0 else 0.0
+    stats = {
+        "prompt_chars": len(prompt),
+        "ttft": ttft,
+        "latency": elapsed,
+        "tokens": tokens,
+        "tokens_per_sec": tokens_per_sec,
+        "stopped_early": final is None
+    }
+    with llm_calls_lock:
+        llm_calls.append(stats)
+    metrics.inc("llm_tokens_total", tokens, model=LLAMA_MODEL)
+    metrics.inc("llm_prompt_chars_total", len(prompt), model=LLAMA_MODEL)
+    metrics.observe("llm_ttft_seconds", ttft, model=LLAMA_MODEL)
+    print(f"⚡ LLaMA: TTFT {ttft:.2f}s, {tokens} tokens at {tokens_per_sec:.1f} tok/s"
+          f"{' (stopped early)' if final is None else ''}")
+    return trim_to_budget(text.strip()), stats
+
+def ask_llama(prompt):
+    with metrics.span("ask_llama", model=LLAMA_MODEL) as span:
+        span.update(prompt_chars=len(prompt), cached=False)
+        key = make_key(LLAMA_MODEL, LLAMA_OPTIONS, STOP_BUDGET, prompt)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            span["cached"] = True
+            metrics.inc("llm_calls_total", model=LLAMA_MODEL, result="cache")
+            return cached
+        try:
+            with llm_slots:
+                summary, stats = stream_generate(prompt)
+        except Exception as e:
+            print(f"⚠️ LLaMA error: {e}")
+            span["error"] = type(e).__name__
+            metrics.inc("llm_calls_total", model=LLAMA_MODEL, result="error")
+            return ""
+        span.update({k: v for k, v in stats.items() if k != "prompt_chars"})
+        metrics.inc("llm_calls_total", model=LLAMA_MODEL, result="generated")
+        if summary:
+            summary_cache.set(key, summary, tag=LLAMA_MODEL)
+        return summary
+
+def print_llm_stats():
+    if not llm_calls:
+        return
+    n = len(llm_calls)
+    early = sum(c["stopped_early"] for c in llm_calls)
+    print(f"⚡ {n} LLaMA calls: mean TTFT {sum(c['ttft'] for c in llm_calls) / n:.2f}s, "
+          f"mean {sum(c['tokens_per_sec'] for c in llm_calls) / n:.1f} tok/s, "
+          f"{sum(c['latency'] for c in llm_calls):.1f}s total, {early} stopped early")
+
+# ==========================
+# Token-budgeted map-reduce
+# ==========================
+def estimate_tokens(text):
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def input_budget(template):
+    # Tokens left for article text once the template and the answer are accounted for
+    return LLAMA_OPTIONS["num_ctx"] - LLAMA_OPTIONS["num_predict"] - estimate_tokens(template) - CONTEXT_MARGIN
+
+def pack_batches(parts, budget, separator="\n\n"):
+    # Greedy, order-preserving packing; an oversized single part is trimmed, never dropped
+    batches = []
+    current = []
+    used = 0
+    for part in parts:
+        if estimate_tokens(part) > budget:
+            part = part[:int(budget * CHARS_PER_TOKEN)]
+        cost = estimate_tokens(part + separator)
+        if current and used + cost > budget:
+            batches.append(separator.join(current))
+            current = []
+            used = 0
+        current.append(part)
+        used += cost
+    if current:
+        batches.append(separator.join(current))
+    return batches
+
+def ask_llama_parallel(prompts):
+    # ask_llama already waits for a free llm_slot, so nested pools cannot overload the server
+    with ThreadPoolExecutor(max_workers=max(LLM_MAX_PARALLEL, 1)) as pool:
+        return list(pool.map(ask_llama, prompts))
+
+def river_prompt(river, joined):
+    return f"""
 You are analyzing NEW scientific articles about {river} River.
 
 Write a very concise digest (2-3 sentences) in Markdown format:
@@ -48,7 +202,44 @@ Write a very concise digest (2-3 sentences) in Markdown format:
 Articles to summarize:
 {joined}
 """
-    return ask_llama(prompt)
+
+def reduce_prompt(river, joined):
+    return f"""
+You are combining partial digests of NEW scientific articles about {river} River.
+
+Merge them into a single very concise digest (2-3 sentences) in Markdown format:
+- keep the most important new data, indices, models, or results
+- relevance for hydrology, drought, climate, or monitoring
+- keep article titles as Markdown links [Title](URL)
+- Start immediately with the digest. Do NOT add bullet points.
+
+Partial digests:
+{joined}
+"""
+
+def process_river_articles(river, articles):
+    parts = []
+    for a in articles:
+        title = a.get("title", "")
+        abstract = a.get("abstract", "")
+        link = a.get("link", "")
+        parts.append(f"[{title}]({link})\n\n{abstract}")
+    batches = pack_batches(parts, input_budget(river_prompt(river, "")))
+    if len(batches) <= 1:
+        return ask_llama(river_prompt(river, batches[0] if batches else ""))
+
+    # Map: summarize context-sized batches in parallel
+    print(f"🧩 {river}: {len(articles)} articles split into {len(batches)} batches")
+    partials = [p for p in ask_llama_parallel([river_prompt(river, b) for b in batches]) if p]
+
+    # Reduce: merge partial digests until they fit into one prompt
+    reduce_budget = input_budget(reduce_prompt(river, ""))
+    while partials:
+        groups = pack_batches(partials, reduce_budget)
+        if len(groups) == 1:
+            return ask_llama(reduce_prompt(river, groups[0]))
+        partials = [p for p in ask_llama_parallel([reduce_prompt(river, g) for g in groups]) if p]
+    return ""
 
 def process_others_articles(articles):
     keywords_list = []
@@ -71,29 +262,88 @@ Keywords:
 """
     return ask_llama(prompt)
 
-def main():
-    print(f"Loading articles from {INPUT_FILE}...")
-    articles = load_articles()
-    if not articles:
-        print("No articles found.")
-        return
+def summarize_river(river, arts):
+    start = time.perf_counter()
+    if river == "Others":
+        summary = process_others_articles(arts)
+    else:
+        summary = process_river_articles(river, arts)
+    return summary, time.perf_counter() - start
+
+def summarize_all(by_river):
+    # All river prompts go out at once; results are collected in by_river order
+    with ThreadPoolExecutor(max_workers=max(LLM_MAX_PARALLEL, 1)) as pool:
+        futures = {}
+        for river, arts in by_river.items():
+            print(f"🌊 {river}: {len(arts)} articles")
+            futures[river] = pool.submit(summarize_river, river, arts)
+        summaries = {}
+        for river, future in futures.items():
+            summary, latency = future.result()
+            print(f"⏱️ {river}: summarized in {latency:.1f}s")
+            summaries[river] = summary
+    return summaries
+
+# ==========================
+# Previous digest reuse
+# ==========================
+def river_fingerprint(arts):
+    # Changes whenever an article is added/removed or its abstract or keywords change
+    items = sorted(
+        (a.get("link") or a.get("title", ""), a.get("abstract", ""), a.get("keywords", ""))
+        for a in arts
+    )
+    return make_key(LLAMA_MODEL, items)
 
+def load_previous_digest():
+    if not os.path.exists(OUTPUT_FILE):
+        return {}
+    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
+        return {row["river"]: row for row in csv.DictReader(f) if row.get("river")}
+
+def group_by_river(articles):
     by_river = defaultdict(list)
     for a in articles:
         river = a.get("river")
         if not river or river.strip() == "":
             river = "Others"
         by_river[river].append(a)
+    return by_river
 
-    print("Generating AI digest per river...\n")
-    river_summaries = []
+def main(full=False, articles=None):
+    # The pipeline hands over the scraped batch in memory; standalone runs read the digest CSV
+    if articles is None:
+        print(f"Loading articles from {INPUT_FILE}...")
+        articles = load_articles()
+    if not articles:
+        print("No articles found.")
+        return []
 
+    by_river = group_by_river(articles)
+    fingerprints = {river: river_fingerprint(arts) for river, arts in by_river.items()}
+
+    # Only pays off when the same input is summarized again (e.g. a rerun of the summarize
+    # stage), and the prompt cache answers that case too; this just skips the map-reduce prompts.
+    # Every week's input is new papers only, so the digest is not built up incrementally.
+    previous = {} if full else load_previous_digest()
+    summaries = {}
+    changed = {}
     for river, arts in by_river.items():
-        print(f"🌊 {river}: {len(arts)} articles")
-        if river == "Others":
-            summary = process_others_articles(arts)
+        prev = previous.get(river)
+        if prev and prev.get("fingerprint") == fingerprints[river] and prev.get("summary"):
+            print(f"♻️ {river}: unchanged, keeping previous summary")
+            summaries[river] = prev["summary"]
         else:
-            summary = process_river_articles(river, arts)
+            changed[river] = arts
+
+    print(f"Generating AI digest for {len(changed)} of {len(by_river)} rivers...\n")
+    start = time.perf_counter()
+    summaries.update(summarize_all(changed))
+    print(f"\n{len(changed)} digests generated in {time.perf_counter() - start:.1f}s")
+    river_summaries = []
+
+    for river, arts in by_river.items():
+        summary = summaries[river]
         kws = set()
         for a in arts:
             k = a.get("keywords", "")
@@ -103,16 +353,47 @@ def main():
         river_summaries.append({
             "river": river,
             "summary": summary,
-            "keywords": kws_str
+            "keywords": kws_str,
+            "fingerprint": fingerprints[river]
         })
 
+    # Rivers without new papers are left out, so the dashboard shows "No new reports" for them
     with open(OUTPUT_FILE, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["river", "summary", "keywords"])
+        writer = csv.DictWriter(f, fieldnames=["river", "summary", "keywords", "fingerprint"])
         writer.writeheader()
         for row in river_summaries:
             writer.writerow(row)
 
     print(f"\n✅ Saved AI digest to {OUTPUT_FILE}")
+    print_llm_stats()
+    print_cache_stats()
+    return river_summaries
+
+# ==========================
+# Summary cache maintenance
+# ==========================
+def print_cache_stats():
+    # Totals live in the cache file, so --cache-stats reports every run so far
+    stats = summary_cache.stats()
+    if stats["hits"] or stats["misses"]:
+        print(f"🗄️ Summary cache this run: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})")
+    print(f"🗄️ Summary cache, all runs: {stats['total_hits']} hits, {stats['total_misses']} misses "
+          f"(hit rate {stats['total_hit_rate']:.0%}, {stats['entries']} entries, {stats['bytes'] / 1024:.1f} KiB)")
+
+def invalidate_model(model):
+    removed = summary_cache.invalidate(tag=model)
+    print(f"🗑️ Removed {removed} cached summaries for model '{model}'")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the AI digest per river.")
+    parser.add_argument("--cache-stats", action="store_true", help="show summary cache size and hit rate over all runs and exit")
+    parser.add_argument("--invalidate-model", metavar="MODEL", help="drop cached summaries for MODEL and exit")
+    parser.add_argument("--full", action="store_true", help="re-summarize every river, ignoring the previous digest")
+    args = parser.parse_args()
+    if args.invalidate_model:
+        invalidate_model(args.invalidate_model)
+    elif args.cache_stats:
+        print_cache_stats()
+    else:
+        main(full=args.full)
+        metrics.export("llama_digest")
\ No newline at end of file
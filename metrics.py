@@ -0,0 +1,158 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from cache import CACHE_DIR
+
+# ==========================
+# Settings
+# ==========================
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(CACHE_DIR, "metrics"))
+METRIC_PREFIX = "newsletter_"
+EXPORT_INTERVAL = float(os.environ.get("METRICS_EXPORT_INTERVAL", 60))  # seconds between export_every() writes
+MAX_JSONL_BYTES = 10 * 1024 * 1024  # a larger <job>.jsonl is rotated to <job>.jsonl.1
+
+# ==========================
+# Registry
+# ==========================
+class Metrics:
+    """In-process spans, counters and summaries, exported as JSON lines and Prometheus text.
+
+    Labels are kept low-cardinality because they become Prometheus series; anything
+    else a span records goes only into its JSON-lines event.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._counters = {}   # (name, labels) -> value
+        self._summaries = {}  # (name, labels) -> [count, sum]
+        self._export_lock = threading.Lock()
+        self._last_export = {}  # job -> time.monotonic() of the last export_every() write
+
+    @staticmethod
+    def _series(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._series(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._series(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    @contextmanager
+    def span(self, name, **labels):
+        # The caller fills the yielded dict with attributes (status, retries, tokens, ...)
+        attrs = {}
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.record(name, started_at, time.perf_counter() - start, labels, attrs)
+
+    def record(self, name, started_at, duration, labels=None, attrs=None):
+        # For spans that cannot be wrapped in a with-block, e.g. a whole Streamlit script run
+        labels = labels or {}
+        self.observe(f"{name}_seconds", duration, **labels)
+        event = {"type": "span", "name": name, "start": started_at, "duration": duration, **labels, **(attrs or {})}
+        with self._lock:
+            self._events.append(event)
+
+    # ==========================
+    # Export
+    # ==========================
+    def export(self, job, metrics_dir=None):
+        """Append buffered events to <job>.jsonl and rewrite <job>.prom with the current totals."""
+        metrics_dir = metrics_dir or METRICS_DIR
+        os.makedirs(metrics_dir, exist_ok=True)
+        jsonl_path = os.path.join(metrics_dir, f"{job}.jsonl")
+        prom_path = os.path.join(metrics_dir, f"{job}.prom")
+        # Serialized: Streamlit runs reruns on several threads of one process
+        with self._export_lock:
+            with self._lock:
+                events, self._events = self._events, []
+                counters = dict(self._counters)
+                summaries = {key: list(value) for key, value in self._summaries.items()}
+
+            if os.path.exists(jsonl_path) and os.path.getsize(jsonl_path) > MAX_JSONL_BYTES:
+                os.replace(jsonl_path, jsonl_path + ".1")
+            with open(jsonl_path, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps({"job": job, **event}, default=str) + "\n")
+
+            # A unique temp file, so a second process exporting the same job cannot collide with it
+            fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, prefix=f"{job}.", suffix=".prom.tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(prometheus_text(counters, summaries, job))
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, prom_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return jsonl_path, prom_path
+
+    def export_every(self, job, interval=EXPORT_INTERVAL, metrics_dir=None):
+        """export() at most once per interval; the rest is flushed when the process exits.
+
+        For long-lived processes such as the dashboard, where exporting on every rerun
+        would put file I/O back on each click. Returns None when the export was skipped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_export.get(job)
+            if last is None:
+                atexit.register(self.export, job, metrics_dir)
+            elif now - last < interval:
+                return None
+            self._last_export[job] = now
+        return self.export(job, metrics_dir)
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def prometheus_text(counters, summaries, job):
+    lines = []
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault((name, "counter"), []).append((labels, value))
+    for (name, labels), value in summaries.items():
+        by_name.setdefault((name, "summary"), []).append((labels, value))
+
+    for (name, kind), series in sorted(by_name.items()):
+        metric = METRIC_PREFIX + name
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in sorted(series):
+            if kind == "counter":
+                lines.append(f"{metric}{_label_text(labels)} {value}")
+            else:
+                count, total = value
+                lines.append(f"{metric}_count{_label_text(labels)} {count}")
+                lines.append(f"{metric}_sum{_label_text(labels)} {total:.6f}")
+
+    lines.append(f"# TYPE {METRIC_PREFIX}last_export_timestamp_seconds gauge")
+    lines.append(f'{METRIC_PREFIX}last_export_timestamp_seconds{{job="{job}"}} {time.time():.3f}')
+    return "\n".join(lines) + "\n"
+
+# Shared by every module of one process
+metrics = Metrics()
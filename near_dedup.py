@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sqlite3
+import zlib
+
+import numpy as np
+
+from cache import CACHE_DIR, make_key
+from corpus_store import INDEX_META_SCHEMA, iter_articles, sync_derived_index
+from dedup import normalize_title, paper_id_from_url
+
+# ==========================
+# Settings
+# ==========================
+CORPUS_FILE = "semantic_scholar_results.csv"
+NEAR_DUP_INDEX_FILE = os.path.join(CACHE_DIR, "near_dup.sqlite")
+
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 10  # shorter abstracts are too generic to call near-duplicates
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard collide in at least one band
+ROWS_PER_BAND = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.8
+SEED = 1
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+CONFIG_HASH = make_key(SHINGLE_WORDS, NUM_PERM, BANDS, SEED)
+
+# a*x + b with 32-bit a, b and x stays below 2**64, so uint64 arithmetic never wraps
+_rng = np.random.RandomState(SEED)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+# ==========================
+# MinHash signatures
+# ==========================
+def shingles(text):
+    words = normalize_title(text).split()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash(text):
+    """MinHash signature (NUM_PERM uint32 values) of the abstract's word shingles, or None if too short."""
+    grams = shingles(text)
+    if len(grams) < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % MERSENNE_PRIME & MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+def similarity(sig_a, sig_b):
+    # Fraction of equal slots estimates the Jaccard similarity of the shingle sets
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+def band_buckets(signature):
+    # One bucket per band; the band number is hashed in so a single indexed column covers all bands
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        digest = hashlib.blake2b(bytes([band]) + rows, digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+    return buckets
+
+def article_key(article):
+    return paper_id_from_url(article.get("link", "")) or normalize_title(article.get("title", ""))
+
+# ==========================
+# LSH index
+# ==========================
+class NearDuplicateIndex:
+    """MinHash LSH index over corpus abstracts, persisted in SQLite.
+
+    A lookup reads the BANDS buckets of the new signature through an index, so its
+    cost depends on the number of colliding papers, not on the corpus size. Papers
+    added with add() stay in memory until sync() writes the persisted corpus rows.
+    """
+
+    def __init__(self, index_path=NEAR_DUP_INDEX_FILE):
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    signature BLOB NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER NOT NULL, doc_id INTEGER NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets (bucket)")
+            self.conn.execute(INDEX_META_SCHEMA)
+        self.pending = {}  # bucket -> [(key, title, signature)] for this run's accepted papers
+
+    def _insert(self, articles):
+        added = 0
+        for a in articles:
+            signature = minhash(a.get("abstract", ""))
+            if signature is None:
+                continue
+            cur = self.conn.execute(
+                "INSERT INTO docs (key, title, signature) VALUES (?, ?, ?)",
+                (article_key(a), a.get("title", ""), signature.tobytes())
+            )
+            self.conn.executemany("INSERT INTO buckets (bucket, doc_id) VALUES (?, ?)", [(b, cur.lastrowid) for b in band_buckets(signature)])
+            added += 1
+        return added
+
+    def find(self, abstract, threshold=SIMILARITY_THRESHOLD):
+        """Papers whose abstract is a near-duplicate: [(key, title, similarity)], best match first."""
+        signature = minhash(abstract)
+        if signature is None:
+            return []
+        buckets = band_buckets(signature)
+        matches = {}
+        placeholders = ", ".join("?" for _ in buckets)
+        rows = self.conn.execute(
+            f"SELECT DISTINCT d.key, d.title, d.signature FROM buckets b JOIN docs d ON d.id = b.doc_id "
+            f"WHERE b.bucket IN ({placeholders})",
+            buckets
+        ).fetchall()
+        candidates = [(key, title, np.frombuffer(sig, dtype=np.uint32)) for key, title, sig in rows]
+        for bucket in buckets:
+            candidates.extend(self.pending.get(bucket, ()))
+        for key, title, other in candidates:
+            score = similarity(signature, other)
+            if score >= threshold and score > matches.get(key, (None, 0))[1]:
+                matches[key] = (title, score)
+        return sorted(((k, t, s) for k, (t, s) in matches.items()), key=lambda m: -m[2])
+
+    def add(self, article):
+        # In-memory only: later papers of the same batch are checked against it
+        signature = minhash(article.get("abstract", ""))
+        if signature is None:
+            return
+        entry = (article_key(article), article.get("title", ""), signature)
+        for bucket in band_buckets(signature):
+            self.pending.setdefault(bucket, []).append(entry)
+
+    def sync(self, csv_path=CORPUS_FILE, appended=None):
+        """Bring the persisted index up to date with the corpus (see corpus_store.sync_derived_index)."""
+        mode, added, _ = sync_derived_index(
+            self.conn, csv_path,
+            insert=self._insert,
+            clear=self._clear,
+            appended=appended,
+            config=CONFIG_HASH
+        )
+        self.pending.clear()
+        if mode != "current":
+            print(f"♊ Near-duplicate index {mode}: +{added} signatures ({len(self)} indexed)")
+        return self
+
+    def _clear(self):
+        self.conn.execute("DELETE FROM buckets")
+        self.conn.execute("DELETE FROM docs")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def sync_near_dup_index(csv_path=CORPUS_FILE, index_path=NEAR_DUP_INDEX_FILE, appended=None):
+    return NearDuplicateIndex(index_path).sync(csv_path, appended=appended)
+
+# ==========================
+# Corpus report
+# ==========================
+def report(csv_path=CORPUS_FILE):
+    # Lists near-duplicate pairs already in the corpus; the CSV itself is left untouched
+    index = sync_near_dup_index(csv_path)
+    seen = set()
+    pairs = 0
+    for a in iter_articles(csv_path):
+        key = article_key(a)
+        seen.add(key)
+        for other_key, other_title, score in index.find(a.get("abstract", "")):
+            if other_key not in seen:
+                pairs += 1
+                print(f"{score:.2f}  {a.get('title', '')}\n      {other_title}")
+    index.close()
+    print(f"Found {pairs} near-duplicate pairs.")
+
+if __name__ == "__main__":
+    report()
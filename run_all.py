@@ -1,57 +1,207 @@
-import subprocess
-import sys
+import argparse
+import json
 import os
 import shutil
+import time
 from datetime import datetime
 
+import llama_digest
+import semantic_scraper
+from archive_store import archive_usage, load_archive_manifest, save_archive_manifest, snapshot_file
+from cache import CACHE_DIR
+from corpus_store import clear_run_cursors, pin_run_cursors
+from keywords import extract_keywords
+from metrics import metrics
+from near_dedup import sync_near_dup_index
+
 # ==========================
 # Archive old CSVs
 # ==========================
-ARCHIVE_DIR = "archive"
-os.makedirs(ARCHIVE_DIR, exist_ok=True)
-
 FILES_TO_ARCHIVE = [
     "semantic_scholar_results.csv",
     "new_articles_digest.csv",
     "new_articles_digest_ai.csv"
 ]
 
-def archive_file(file_path):
+def archive_file(file_path, manifest=None):
+    # Content-addressed: an unchanged file only adds a manifest entry pointing at its existing blob
     if os.path.exists(file_path):
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        base_name = os.path.basename(file_path)
-        new_name = f"{ARCHIVE_DIR}/{date_str}_{base_name}"
-        shutil.copy(file_path, new_name)
-        print(f"Archived {file_path} → {new_name}")
+        digest, created = snapshot_file(file_path, manifest=manifest)
+        status = "stored" if created else "unchanged, reused"
+        print(f"Archived {file_path} → blob {digest[:12]} ({status})")
+        return digest
 
 # ==========================
-# Run a Python script
+# Pipeline checkpoints
 # ==========================
-def run_script(script_name):
-    if os.path.exists(script_name):
-        print(f"\n➡️ Running {script_name} ...")
-        result = subprocess.run([sys.executable, script_name])
-        if result.returncode != 0:
-            print(f"⚠️ Error while running {script_name}")
-            sys.exit(1)
-    else:
-        print(f"⚠️ {script_name} not found, skipping.")
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "pipeline")
+
+def checkpoint_path(run_id, stage):
+    return os.path.join(CHECKPOINT_DIR, run_id, f"{stage}.json")
+
+def load_checkpoint(run_id, stage):
+    path = checkpoint_path(run_id, stage)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(run_id, stage, output, elapsed):
+    path = checkpoint_path(run_id, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"stage": stage, "elapsed": elapsed, "completed_at": datetime.now().isoformat(), "output": output}, f)
+    os.replace(tmp_path, path)
+
+def clear_checkpoints(run_id):
+    run_dir = os.path.join(CHECKPOINT_DIR, run_id)
+    if os.path.isdir(run_dir):
+        shutil.rmtree(run_dir)
 
 # ==========================
-# Main function
+# Corpus state shared by the scraper stages
+# ==========================
+_corpus = {}
+_run = {}  # id of the run in progress, set by run_pipeline
+
+def corpus_state():
+    # Manifest and dedup index are loaded once per process; a resumed run loads them on first use
+    if not _corpus:
+        manifest, last_scraped_date = semantic_scraper.load_existing()
+        _corpus.update(
+            manifest=manifest,
+            last_scraped_date=last_scraped_date,
+            index=semantic_scraper.build_corpus_index()
+        )
+    return _corpus
+
+# ==========================
+# Stages
+# ==========================
+# Each stage takes the previous stage's output and returns a JSON-serializable batch
+def archive_stage(batch):
+    manifest = load_archive_manifest()
+    archived = {f: archive_file(f, manifest) for f in FILES_TO_ARCHIVE}
+    save_archive_manifest(manifest)
+    logical, stored = archive_usage()
+    print(f"📦 Archive: {logical / 1024:.1f} KiB of snapshots in {stored / 1024:.1f} KiB of blobs")
+    return {"archived": {f: digest for f, digest in archived.items() if digest}}
+
+def fetch_stage(batch):
+    corpus = corpus_state()
+    queries = semantic_scraper.SMART_QUERIES
+    cursors = pin_run_cursors(
+        semantic_scraper.CSV_FILE, corpus["manifest"], _run["id"],
+        semantic_scraper.query_cursors(corpus["manifest"], queries, corpus["last_scraped_date"])
+    )
+    results, watermarks = semantic_scraper.fetch_all(queries, cursors, corpus["index"])
+    semantic_scraper.client.close()
+    return {"results": results, "watermarks": watermarks}
+
+def dedup_stage(batch):
+    near_index = sync_near_dup_index(semantic_scraper.CSV_FILE)
+    try:
+        articles = semantic_scraper.build_entries(semantic_scraper.SMART_QUERIES, batch["results"], corpus_state()["index"], near_index)
+    finally:
+        near_index.close()
+    return {"articles": articles, "watermarks": batch["watermarks"]}
+
+def keywords_stage(batch):
+    extract_keywords(batch["articles"])
+    return batch
+
+def persist_stage(batch):
+    # A rerun after a failure past the append must not append the batch twice, so the
+    # batch is checked against the corpus as it is on disk now
+    manifest, _ = semantic_scraper.load_existing()
+    on_disk = semantic_scraper.build_corpus_index()
+    appended = [a for a in batch["articles"] if not on_disk.contains(a["title"], a["link"])]
+    if len(appended) < len(batch["articles"]):
+        print(f"{len(batch['articles']) - len(appended)} articles of this batch are already in {semantic_scraper.CSV_FILE}")
+
+    semantic_scraper.save_digest(batch["articles"])
+    semantic_scraper.update_main_csv(manifest, appended)
+    semantic_scraper.update_query_watermarks(semantic_scraper.CSV_FILE, manifest, batch["watermarks"])
+    return {"articles": batch["articles"], "appended": appended}
+
+def index_stage(batch):
+    semantic_scraper.sync_corpus_indexes(batch["appended"])
+    return {"articles": batch["articles"]}
+
+def summarize_stage(batch):
+    # With no new articles, re-check last week's digest file as the standalone script did
+    rows = llama_digest.main(articles=batch["articles"] or None)
+    return {"rivers": len(rows)}
+
+STAGES = [
+    ("archive", archive_stage),
+    ("fetch", fetch_stage),
+    ("dedup", dedup_stage),
+    ("keywords", keywords_stage),
+    ("persist", persist_stage),
+    ("index", index_stage),
+    ("summarize", summarize_stage),
+]
+
+# ==========================
+# Orchestrator
 # ==========================
-def main():
-    # 1. Archive old CSV files
-    for f in FILES_TO_ARCHIVE:
-        archive_file(f)
+def run_pipeline(run_id, stages=STAGES):
+    _run["id"] = run_id
+    timings = []
+    batch = None
+    try:
+        for name, stage in stages:
+            checkpoint = load_checkpoint(run_id, name)
+            if checkpoint is not None:
+                print(f"\n⏭️ Stage '{name}' already completed at {checkpoint['completed_at']}, skipping.")
+                batch = checkpoint["output"]
+                timings.append((name, None))
+                continue
 
-    # 2. Scraping new articles
-    run_script("semantic_scraper.py")
+            print(f"\n➡️ Stage '{name}' ...")
+            start = time.perf_counter()
+            with metrics.span("pipeline_stage", stage=name):
+                batch = stage(batch)
+            elapsed = time.perf_counter() - start
+            save_checkpoint(run_id, name, batch, elapsed)
+            timings.append((name, elapsed))
+    except Exception:
+        print(f"\n⚠️ Error in stage '{name}'; rerun to resume from this stage.")
+        print_timings(timings)
+        raise
+    print_timings(timings)
+    return batch
 
-    # 3. AI digest generation
-    run_script("llama_digest.py")
+def print_timings(timings):
+    print("\n⏱️ Stage timings:")
+    for name, elapsed in timings:
+        print(f"  {name:<10} {'skipped (checkpoint)' if elapsed is None else f'{elapsed:.1f}s'}")
+    total = sum(elapsed for _, elapsed in timings if elapsed is not None)
+    print(f"  {'total':<10} {total:.1f}s")
 
+# ==========================
+# Main function
+# ==========================
+def main(run_id=None, restart=False):
+    # One checkpoint set per day, so a rerun of a failed weekly update resumes where it stopped
+    run_id = run_id or datetime.now().strftime("%Y-%m-%d")
+    if restart:
+        clear_checkpoints(run_id)
+    try:
+        run_pipeline(run_id)
+    finally:
+        jsonl_path, prom_path = metrics.export("pipeline")
+        print(f"📈 Metrics written to {jsonl_path} and {prom_path}")
+    # Finished: a later run on the same day starts over instead of skipping every stage
+    clear_checkpoints(run_id)
+    clear_run_cursors(semantic_scraper.CSV_FILE)
     print("\n🎉 Weekly update completed successfully!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the weekly scrape + digest pipeline.")
+    parser.add_argument("--run-id", help="checkpoint set to use (default: today's date)")
+    parser.add_argument("--restart", action="store_true", help="discard this run's checkpoints and run every stage")
+    args = parser.parse_args()
+    main(run_id=args.run_id, restart=args.restart)
@@ -0,0 +1,184 @@
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import make_key
+from metrics import metrics
+
+# ==========================
+# Shared rate limiter
+# ==========================
+class TokenBucket:
+    """Token bucket shared by all query workers, so together they stay within the API quota."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def drain(self):
+        # Called on 429: the quota is shared, so every worker slows to the steady rate
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0)
+
+# ==========================
+# Retry helpers
+# ==========================
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+# Request parameters that identify a search page in the response cache
+CACHE_KEY_PARAMS = ["query", "offset", "publicationDateOrYear", "fieldsOfStudy", "fields"]
+
+# ==========================
+# Semantic Scholar client
+# ==========================
+class ScholarClient:
+    """Pooled keep-alive session for the Semantic Scholar search endpoint."""
+
+    def __init__(self, api_url, limiter, api_key=None, max_connections=4,
+                 max_attempts=5, backoff_base=30, max_wait=300, timeout=30, cache=None):
+        self.api_url = api_url
+        self.limiter = limiter
+        self.cache = cache
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.max_wait = max_wait
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+            "User-Agent": "AI-Newsletter/1.0 (+https://github.com/SincereJuliya/AI-Newsletter)",
+        })
+        if api_key:
+            self.session.headers["x-api-key"] = api_key
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_wait)
+        return min(self.backoff_base * (2 ** attempt) + random.uniform(0, 3), self.max_wait)
+
+    def search(self, params, label=""):
+        with metrics.span("fetch_batch", query=label) as span:
+            span.update(offset=params.get("offset", 0), status="", retries=0, backoff_seconds=0.0)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = make_key(self.api_url, {k: str(params.get(k, "")) for k in CACHE_KEY_PARAMS})
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    span["status"] = "cache"
+                    metrics.inc("fetch_batch_total", status="cache")
+                    return json.loads(cached)
+
+            data = self._fetch(params, label, span)
+            if data is not None and cache_key is not None:
+                self.cache.set(cache_key, json.dumps(data))
+            span["papers"] = len(data or [])
+            metrics.inc("fetch_batch_total", status=span["status"] or "error")
+            return data or []
+
+    def _sleep(self, span, wait_time):
+        span["retries"] += 1
+        span["backoff_seconds"] += wait_time
+        metrics.inc("fetch_retries_total")
+        metrics.inc("fetch_backoff_seconds_total", wait_time)
+        time.sleep(wait_time)
+
+    def _fetch(self, params, label, span):
+        # Returns None when the page could not be fetched, so failures are never cached
+        for attempt in range(self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                r = self.session.get(self.api_url, params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                span["status"] = "exception"
+                if attempt >= self.max_attempts:
+                    print(f"⚠️ Request exception: {e} → skipping query '{label}'")
+                    return None
+                wait_time = self._backoff(attempt)
+                print(f"⚠️ Request exception: {e} → retrying in {wait_time:.1f}s (attempt {attempt+1})")
+                self._sleep(span, wait_time)
+                continue
+
+            span["status"] = r.status_code
+            metrics.inc("http_responses_total", status=r.status_code)
+
+            if r.status_code == 200:
+                return r.json().get("data", [])
+            if r.status_code in RETRY_STATUSES:
+                if r.status_code == 429:
+                    self.limiter.drain()
+                if attempt >= self.max_attempts:
+                    print(f"⚠️ Maximum attempts reached for query '{label}' → skipping")
+                    return None
+                # Only this query's worker sleeps; the other queries keep using the shared budget
+                wait_time = self._backoff(attempt, parse_retry_after(r.headers.get("Retry-After")))
+                print(f"⚠️ {r.status_code} Error for '{label}' → retrying in {wait_time:.1f}s (attempt {attempt+1})")
+                self._sleep(span, wait_time)
+                continue
+            if r.status_code == 400:
+                print("⚠️ 400 Bad Request → skipping this batch")
+                return None
+            if r.status_code == 401:
+                print("⚠️ 401 Unauthorized → check your API key or credentials")
+                return None
+            if r.status_code == 403:
+                print("⚠️ 403 Forbidden → access denied for this resource")
+                return None
+            if r.status_code == 404:
+                print("⚠️ 404 Not Found → resource does not exist")
+                return None
+            r.raise_for_status()
+            return None
+        return None
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"🗄️ Response cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
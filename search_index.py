@@ -0,0 +1,82 @@
+import os
+import re
+import sqlite3
+import time
+
+from cache import CACHE_DIR
+from corpus_store import INDEX_META_SCHEMA, sync_derived_index
+
+# ==========================
+# Settings
+# ==========================
+CORPUS_FILE = "semantic_scholar_results.csv"
+SEARCH_INDEX_FILE = os.path.join(CACHE_DIR, "search.sqlite")
+
+SEARCH_COLUMNS = ["title", "abstract", "authors", "keywords"]
+STORED_COLUMNS = ["link", "river", "year", "publicationDate"]
+# bm25 weights, in SEARCH_COLUMNS order: a title hit counts most
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+
+# ==========================
+# Index storage
+# ==========================
+def open_index(index_path=SEARCH_INDEX_FILE):
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(index_path, check_same_thread=False)
+    columns = ", ".join(SEARCH_COLUMNS + [f"{c} UNINDEXED" for c in STORED_COLUMNS])
+    with conn:
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5({columns}, tokenize='porter unicode61 remove_diacritics 2')")
+        conn.execute(INDEX_META_SCHEMA)
+    return conn
+
+def _insert(conn, articles):
+    columns = SEARCH_COLUMNS + STORED_COLUMNS
+    placeholders = ", ".join("?" for _ in columns)
+    rows = [[str(a.get(c) or "") for c in columns] for a in articles]
+    conn.executemany(f"INSERT INTO articles ({', '.join(columns)}) VALUES ({placeholders})", rows)
+    return len(rows)
+
+# ==========================
+# Incremental sync
+# ==========================
+def sync_index(csv_path=CORPUS_FILE, index_path=SEARCH_INDEX_FILE, appended=None):
+    """Bring the index up to date with the append-only corpus (see corpus_store.sync_derived_index)."""
+    conn = open_index(index_path)
+    mode, added, row_count = sync_derived_index(
+        conn, csv_path,
+        insert=lambda rows: _insert(conn, rows),
+        clear=lambda: conn.execute("DELETE FROM articles"),
+        appended=appended
+    )
+    if mode != "current":
+        print(f"🔎 Search index {mode}: +{added} rows ({row_count} indexed)")
+    return conn
+
+# ==========================
+# Query
+# ==========================
+def to_match_query(text):
+    # Free text -> FTS5 query: every word must match (prefix match on the last one)
+    terms = re.findall(r"\w+", text, flags=re.UNICODE)
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search(conn, text, limit=50):
+    match = to_match_query(text)
+    if not match:
+        return [], 0.0
+    start = time.perf_counter()
+    columns = SEARCH_COLUMNS + STORED_COLUMNS
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    rows = conn.execute(
+        f"SELECT {', '.join(columns)}, bm25(articles, {weights}) AS score FROM articles "
+        f"WHERE articles MATCH ? ORDER BY score LIMIT ?",
+        (match, limit)
+    ).fetchall()
+    results = [dict(zip(columns + ["score"], row)) for row in rows]
+    return results, time.perf_counter() - start
@@ -1,12 +1,25 @@
 from collections import defaultdict
-import random
-import requests
-import time
+from concurrent.futures import ThreadPoolExecutor
 import csv
 import os
 from datetime import datetime, timedelta
-import yake
-from tqdm import tqdm
+
+from cache import CACHE_DIR, SQLiteCache
+from corpus_store import (
+    append_articles,
+    clear_run_cursors,
+    iter_articles,
+    load_manifest,
+    pin_run_cursors,
+    query_watermark,
+    update_query_watermarks
+)
+from dedup import DedupIndex
+from keywords import extract_keywords
+from metrics import metrics
+from near_dedup import sync_near_dup_index
+from scholar_client import ScholarClient, TokenBucket
+from search_index import sync_index
 
 # ==========================
 # Settings
@@ -14,10 +27,21 @@ from tqdm import tqdm
 CSV_FILE = "semantic_scholar_results.csv"
 DIGEST_FILE = "new_articles_digest.csv"
 
-API_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+API_URL = os.environ.get("S2_API_URL", "https://api.semanticscholar.org/graph/v1/paper/search")
 
 fields_filter = "Environmental Science,Agricultural,Geography,Geology,Engineering,Physics,Computer Science"
 
+# Shared request budget for all queries (Semantic Scholar: ~1 req/s without API key)
+REQUESTS_PER_SECOND = float(os.environ.get("S2_REQUESTS_PER_SECOND", "1"))
+RATE_BURST = 1
+MAX_WORKERS = 4
+
+# On-disk cache of search pages, so a re-run after a later failure does not burn quota.
+# Retries reuse the run's pinned cursors (pin_run_cursors), so the TTL only has to cover a retry, not a week
+HTTP_CACHE_FILE = os.path.join(CACHE_DIR, "s2_responses.sqlite")
+HTTP_CACHE_TTL = float(os.environ.get("S2_CACHE_TTL", 24 * 3600))  # seconds
+HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
 RIVERS = ["Po", "Sarca", "Chiese", "Adige", "Noce", "Brenta", "Avisio"]
 KEY_TERMS = [
     ["drought", "Italy"],
@@ -35,23 +59,22 @@ KEY_TERMS = [
 ]
 
 # ==========================
-# Load existing CSV (or archive)
+# Load corpus manifest and dedup index
 # ==========================
-if os.path.exists(CSV_FILE):
-    with open(CSV_FILE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        existing_articles = list(reader)
-    print(f"Loaded {len(existing_articles)} existing articles.")
-    last_dates = [a.get("publicationDate", "") for a in existing_articles if a.get("publicationDate")]
-    last_scraped_date = max(last_dates) if last_dates else (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-else:
-    existing_articles = []
-    last_scraped_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-    with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["title","authors","year","publicationDate","link","abstract","river","keywords","source","scraped_at"])
-        writer.writeheader()
+def load_existing():
+    manifest = load_manifest(CSV_FILE)
+    print(f"Corpus has {manifest['row_count']} existing articles.")
+    last_scraped_date = manifest.get("max_publication_date") or (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    print(f"Last publication date in the scraped dataset: {last_scraped_date}")
+    return manifest, last_scraped_date
+
+def query_cursors(manifest, queries, default_date):
+    # Each query resumes from its own high-water mark instead of the global one
+    return {q['query']: query_watermark(manifest, q['query']) or default_date for q in queries}
 
-print(f"Last publication date in the scraped dataset: {last_scraped_date}")
+def build_corpus_index():
+    # Streams the corpus; only titles and paper IDs stay in memory
+    return DedupIndex(iter_articles(CSV_FILE))
 
 # ==========================
 # Build queries
@@ -75,81 +98,95 @@ SMART_QUERIES = build_smart_queries()
 # ==========================
 # Fetch papers
 # ==========================
-def fetch_batch(query, offset=0, attempt=0, max_attempts=5):
-    backoff_base = 30  # 
-    max_wait = 300     #
+client = ScholarClient(
+    API_URL,
+    TokenBucket(REQUESTS_PER_SECOND, RATE_BURST),
+    api_key=os.environ.get("S2_API_KEY"),
+    max_connections=MAX_WORKERS,
+    cache=SQLiteCache(HTTP_CACHE_FILE, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES)
+)
+
+def fetch_batch(query, since, offset=0):
     params = {
         "query": query,
         "fields": "title,authors,year,publicationDate,url,abstract",
         "offset": offset,
-        "publicationDateOrYear": f"{last_scraped_date}:",
+        "publicationDateOrYear": f"{since}:",
         "fieldsOfStudy": fields_filter
     }
-    try:
-        r = requests.get(API_URL, params=params)
-    except requests.exceptions.RequestException as e:
-        if attempt >= max_attempts:
-            print(f"⚠️ Request exception: {e} → skipping query '{query}'")
-            return []
-        wait_time = min(backoff_base * (2 ** attempt) + random.uniform(0, 3), max_wait)
-        print(f"⚠️ Request exception: {e} → retrying in {wait_time:.1f}s (attempt {attempt+1})")
-        time.sleep(wait_time)
-        return fetch_batch(query, offset, attempt + 1, max_attempts)
-
-    if r.status_code == 200:
-        return r.json().get("data", [])
-    elif r.status_code in [429, 500]:
-        if attempt >= max_attempts:
-            print(f"⚠️ Maximum attempts reached for query '{query}' → skipping")
-            return []
-        wait_time = min(backoff_base * (2 ** attempt) + random.uniform(0, 3), max_wait)
-        print(f"⚠️ {r.status_code} Error → retrying in {wait_time:.1f}s (attempt {attempt+1})")
-        time.sleep(wait_time)
-        return fetch_batch(query, offset, attempt + 1, max_attempts)
-    elif r.status_code == 400:
-        print("⚠️ 400 Bad Request → skipping this batch")
-        return []
-    elif r.status_code == 401:
-        print("⚠️ 401 Unauthorized → check your API key or credentials")
-        return []
-    elif r.status_code == 403:
-        print("⚠️ 403 Forbidden → access denied for this resource")
-        return []
-    elif r.status_code == 404:
-        print("⚠️ 404 Not Found → resource does not exist")
-        return []
-    
-    else:
-        r.raise_for_status()
+    return client.search(params, label=query)
 
 # ==========================
-# Main scraping loop
+# Concurrent query executor
 # ==========================
-all_new_articles = []
-
-for q in SMART_QUERIES:
+def scrape_query(q, since, corpus_index):
     query = q['query']
-    river = q['river']
-    print(f"\n🔍 Query: {query}")
+    print(f"🔍 Query: {query} (since {since})")
+    found = []
+    seen = DedupIndex()
+    watermark = ""
     offset = 0
     while True:
-        papers = fetch_batch(query, offset)
+        papers = fetch_batch(query, since, offset)
         if not papers:
-            print("No more papers found for this query.")
+            print(f"No more papers found for '{query}'.")
             break
 
         new_count = 0
+        for paper in papers:
+            watermark = max(watermark, paper.get("publicationDate") or "")
+            title = (paper.get("title") or "").strip()
+            if not title or not paper.get("year"):
+                continue
+            url = paper.get("url", "")
+            # corpus_index is only read here; the main thread updates it after all workers finish
+            if seen.contains(title, url) or corpus_index.contains(title, url):
+                continue
+            seen.add(title, url)
+            found.append(paper)
+            new_count += 1
+
+        if new_count == 0:
+            print(f"No new articles in this batch for '{query}', moving on.")
+            break
+
+        offset += len(papers)
+    return found, watermark
+
+def fetch_all(queries, cursors, corpus_index):
+    # Results come back in query order, so river queries still claim shared papers first
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        results = list(pool.map(lambda q: scrape_query(q, cursors[q['query']], corpus_index), queries))
+    papers = [found for found, _ in results]
+    watermarks = {q['query']: watermark for q, (_, watermark) in zip(queries, results)}
+    return papers, watermarks
+
+# ==========================
+# Build new entries
+# ==========================
+def build_entries(queries, results, corpus_index, near_index=None):
+    all_new_articles = []
+    near_duplicates = 0
+    for q, papers in zip(queries, results):
+        river = q['river']
         for paper in papers:
             pub_date = paper.get("publicationDate")
             year = paper.get("year")
             title = (paper.get("title") or "").strip()
-            if not title or not year:
-                continue
-            if any(a["title"] == title for a in existing_articles + all_new_articles):
+            if corpus_index.contains(title, paper.get("url", "")):
                 continue
+            corpus_index.add(title, paper.get("url", ""))
             authors = ", ".join([a.get("name","") for a in paper.get("authors",[])])
             abstract = (paper.get("abstract") or "").replace("\n"," ").strip()
 
+            if near_index is not None:
+                # Same study under another title (preprint vs. journal version)
+                match = near_index.find(abstract)
+                if match:
+                    near_duplicates += 1
+                    print(f"♊ Skipping near-duplicate ({match[0][2]:.0%} similar): {title} ≈ {match[0][1]}")
+                    continue
+
             entry = {
                 "title": title,
                 "authors": authors,
@@ -163,65 +200,63 @@ for q in SMART_QUERIES:
                 "scraped_at": datetime.now().isoformat()
             }
             all_new_articles.append(entry)
-            new_count += 1
+            if near_index is not None:
+                near_index.add(entry)
             print(f"✅ {title}")
 
-        if new_count == 0:
-            print("No new articles in this batch, moving to next query.")
-            break
-
-        offset += len(papers)
-
-print(f"\nTotal new articles collected: {len(all_new_articles)}")
+    print(f"\nTotal new articles collected: {len(all_new_articles)} ({near_duplicates} near-duplicates skipped)")
+    return all_new_articles
 
 # ==========================
-# YAKE keywords
+# Save new digest
 # ==========================
-yake_kw_extractor = yake.KeywordExtractor(
-    lan="en",
-    n=3,
-    top=7,
-    dedupLim=0.9,
-    dedupFunc='seqSimilarity',
-    windowsSize=2
-)
-RELEVANT_TERMS = [
-    "drought", "water", "river", "basin", "irrigation", "scarcity", 
-    "flow", "hydrology", "climate", "precipitation", "flooding", 
-    "water stress", "sustainability", "water management", 
-    "groundwater", "evaporation", "runoff", "conservation", 
-    "water quality", "ecosystem", "water conservation", "resource management"
-    ]
-
-for article in tqdm(all_new_articles):
-    abstract = article.get("abstract","")
-    if abstract:
-        kws = yake_kw_extractor.extract_keywords(abstract)
-        filtered_kws = [kw for kw, score in kws if any(term.lower() in kw.lower() for term in RELEVANT_TERMS)]
-        article["keywords"] = ", ".join(filtered_kws)
+def save_digest(all_new_articles):
+    if all_new_articles:
+        with open(DIGEST_FILE, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=all_new_articles[0].keys())
+            writer.writeheader()
+            writer.writerows(all_new_articles)
+        print(f"Saved digest of {len(all_new_articles)} new articles to {DIGEST_FILE}")
     else:
-        article["keywords"] = ""
+        print("No new articles found for digest.")
 
 # ==========================
-# Save new digest
+# Update main CSV
 # ==========================
-if all_new_articles:
-    with open(DIGEST_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=all_new_articles[0].keys())
-        writer.writeheader()
-        writer.writerows(all_new_articles)
-    print(f"Saved digest of {len(all_new_articles)} new articles to {DIGEST_FILE}")
-else:
-    print("No new articles found for digest.")
+def update_main_csv(manifest, all_new_articles):
+    if all_new_articles:
+        append_articles(CSV_FILE, all_new_articles, manifest)
+        print(f"Appended {len(all_new_articles)} new articles to main CSV {CSV_FILE} ({manifest['row_count']} total).")
+
+def sync_corpus_indexes(appended=None):
+    # Search and near-duplicate indexes; both fall back to reading the CSV if they missed an append
+    sync_index(CSV_FILE, appended=appended).close()
+    sync_near_dup_index(CSV_FILE, appended=appended).close()
 
 # ==========================
-# Update main CSV
+# Main function
 # ==========================
-if all_new_articles:
-    combined_articles = existing_articles + all_new_articles
-    combined_articles = sorted(combined_articles, key=lambda x: x["publicationDate"], reverse=True)
-    with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=combined_articles[0].keys())
-        writer.writeheader()
-        writer.writerows(combined_articles)
-    print(f"Updated main CSV {CSV_FILE} with {len(all_new_articles)} new articles.")
\ No newline at end of file
+def main(run_id=None):
+    # One run per day: a retry the same day fetches with the cursors the first attempt used
+    run_id = run_id or datetime.now().strftime("%Y-%m-%d")
+    manifest, last_scraped_date = load_existing()
+    corpus_index = build_corpus_index()
+    cursors = pin_run_cursors(CSV_FILE, manifest, run_id, query_cursors(manifest, SMART_QUERIES, last_scraped_date))
+
+    results, watermarks = fetch_all(SMART_QUERIES, cursors, corpus_index)
+    near_index = sync_near_dup_index(CSV_FILE)
+    all_new_articles = build_entries(SMART_QUERIES, results, corpus_index, near_index)
+    near_index.close()
+
+    client.close()
+
+    extract_keywords(all_new_articles)
+    save_digest(all_new_articles)
+    update_main_csv(manifest, all_new_articles)
+    update_query_watermarks(CSV_FILE, manifest, watermarks)
+    sync_corpus_indexes(all_new_articles)
+    clear_run_cursors(CSV_FILE, manifest)
+
+if __name__ == "__main__":
+    main()
+    metrics.export("semantic_scraper")
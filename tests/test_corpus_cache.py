@@ -0,0 +1,162 @@
+import csv
+import sqlite3
+
+import pytest
+
+import cache
+from bench_stubs import ScholarStub, corpus_row, synthetic_papers
+from cache import SQLiteCache
+from corpus_store import CORPUS_FIELDS, INDEX_META_SCHEMA, append_articles, iter_articles, load_manifest, sync_derived_index
+
+# ==========================
+# Helpers
+# ==========================
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def write_corpus(path, papers):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CORPUS_FIELDS)
+        writer.writeheader()
+        writer.writerows(corpus_row(p) for p in papers)
+
+class ListIndex:
+    """Derived index that just collects the rows handed to it."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(INDEX_META_SCHEMA)
+        self.rows = []
+
+    def insert(self, rows):
+        rows = list(rows)
+        self.rows.extend(r["link"] for r in rows)
+        return len(rows)
+
+    def clear(self):
+        self.rows = []
+
+    def sync(self, csv_path, appended=None, config=""):
+        mode, _, _ = sync_derived_index(self.conn, csv_path, self.insert, self.clear, appended=appended, config=config)
+        return mode
+
+# ==========================
+# SQLiteCache
+# ==========================
+def test_cache_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    c = SQLiteCache(str(tmp_path / "c.sqlite"), ttl=60)
+    c.set("a", "1")
+    clock.now += 30
+    assert c.get("a") == "1"
+    clock.now += 31
+    assert c.get("a") is None
+    assert c.stats()["bytes"] == 0
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    c = SQLiteCache(str(tmp_path / "c.sqlite"), max_bytes=350)
+    for key in "abc":
+        c.set(key, "x" * 100)
+        clock.now += 1
+    assert c.get("a") is not None  # a is now the most recently used
+    clock.now += 1
+    c.set("d", "x" * 100)
+    assert c.get("b") is None
+    assert c.get("a") is not None and c.get("d") is not None
+    assert c.stats()["bytes"] <= 350
+
+def test_cache_byte_total_survives_reopen(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    c = SQLiteCache(path, max_bytes=10_000)
+    c.set_many([(str(i), "x" * 10) for i in range(20)])
+    c.set("0", "x" * 30)  # replacing an entry only counts the size difference
+    c.invalidate(tag="other")
+    c.close()
+    reopened = SQLiteCache(path, max_bytes=10_000)
+    assert reopened._total_bytes() == reopened.stats()["bytes"] == 19 * 10 + 30
+
+# ==========================
+# Derived index sync
+# ==========================
+@pytest.fixture
+def corpus(tmp_path):
+    papers = synthetic_papers(30, abstract_words=30)
+    path = str(tmp_path / "corpus.csv")
+    write_corpus(path, papers[:10])
+    return path, [corpus_row(p) for p in papers[10:]]
+
+def test_sync_modes(corpus):
+    path, more = corpus
+    index = ListIndex()
+    assert index.sync(path) == "rebuild"
+    assert index.sync(path) == "current"
+
+    append_articles(path, more[:5], load_manifest(path))
+    assert index.sync(path, appended=more[:5]) == "appended"
+
+    # An index that missed an append reads only the rows after the ones it has
+    append_articles(path, more[5:10], load_manifest(path))
+    assert index.sync(path) == "incremental"
+    assert index.rows == [r["link"] for r in iter_articles(path)]
+
+    assert index.sync(path, config="other settings") == "rebuild"
+    assert index.rows == [r["link"] for r in iter_articles(path)]
+
+def test_sync_rebuilds_after_rewrite_then_append(corpus):
+    path, more = corpus
+    index = ListIndex()
+    index.sync(path)
+
+    # Rewritten outside the store (e.g. a keyword backfill), then appended to before the next sync
+    rows = list(iter_articles(path))
+    for r in rows:
+        r["keywords"] = "drought"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CORPUS_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    append_articles(path, more[:5], load_manifest(path))
+
+    assert index.sync(path, appended=more[:5]) == "rebuild"
+    assert index.rows == [r["link"] for r in iter_articles(path)]
+
+# ==========================
+# Scraper retries
+# ==========================
+def test_scraper_retry_is_served_from_cache(tmp_path, monkeypatch):
+    # Relative paths (corpus, digest, .cache/) resolve inside the scratch directory
+    monkeypatch.chdir(tmp_path)
+    write_corpus("semantic_scholar_results.csv", [])
+    stub = ScholarStub(papers=synthetic_papers(40, start_date="2030-01-01", days=30))
+    url = stub.start()
+    try:
+        import semantic_scraper
+        from scholar_client import ScholarClient, TokenBucket
+
+        def new_client():
+            return ScholarClient(url, TokenBucket(1000, 10), cache=SQLiteCache(str(tmp_path / "responses.sqlite"), ttl=3600))
+
+        def fail_once(appended=None):
+            raise RuntimeError("index sync failed")
+
+        monkeypatch.setattr(semantic_scraper, "client", new_client())
+        monkeypatch.setattr(semantic_scraper, "sync_corpus_indexes", fail_once)
+        with pytest.raises(RuntimeError):
+            semantic_scraper.main(run_id="run-1")
+        assert stub.reset_counters()["requests"] > 0
+
+        # The failed run already advanced the watermarks; the retry must still send the same requests
+        monkeypatch.setattr(semantic_scraper, "client", new_client())
+        monkeypatch.setattr(semantic_scraper, "sync_corpus_indexes", lambda appended=None: None)
+        semantic_scraper.main(run_id="run-1")
+        assert stub.reset_counters()["requests"] == 0
+        assert "run_cursors" not in load_manifest("semantic_scholar_results.csv")
+    finally:
+        stub.shutdown()